@@ -0,0 +1,8 @@
+import pytest
+from lib.db.testing import assert_max_queries as _assert_max_queries
+
+
+@pytest.fixture
+def assert_max_queries():
+    """with assert_max_queries(3): fails the test past three model statements"""
+    return _assert_max_queries
@@ -0,0 +1,126 @@
+import asyncio
+
+import psycopg2.errors
+import pytest
+from lib.db import aio, instrumentation
+from lib.db.aio import AsyncPool
+from lib.db.breaker import CircuitBreaker, CircuitOpen
+from lib.db.query import StatementTimeout
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.connection.sent.append(sql)
+        if self.connection.error is not None and not sql.startswith(("BEGIN", "ROLLBACK")):
+            raise self.connection.error
+        if "FETCH" in sql:
+            self.rows, self.connection.rows = self.connection.rows[:2], self.connection.rows[2:]
+        elif sql.startswith("SELECT") or "; SELECT" in sql:
+            self.rows = [{"id": 1}]
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, rows=(), error=None):
+        self.sent = []
+        self.rows = list(rows)
+        self.error = error
+
+    def poll(self):
+        return psycopg2.extensions.POLL_OK
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = FakeConnection(rows=[{"id": i} for i in range(6)])
+
+    async def connect(config=None):
+        return conn
+
+    monkeypatch.setattr(aio, "connect", connect)
+    return conn
+
+
+def run(coroutine_function):
+    return asyncio.run(coroutine_function())
+
+
+# Tests
+def test_query_goes_through_hooks_and_timeout(conn):
+    events = []
+    instrumentation.add_hook(after=events.append)
+    try:
+        pool = AsyncPool(min_size=0)
+        assert run(lambda: aio.query("Author.find_by_name", "%a%", pool=pool)) == [{"id": 1}]
+    finally:
+        instrumentation.remove_hook(after=events.append)
+    assert conn.sent == ["SET LOCAL statement_timeout = 2000; SELECT * FROM authors WHERE name ILIKE %s ORDER BY name"]
+    [event] = events
+    assert event.method == "Author.find_by_name" and event.rowcount == 1
+
+
+def test_query_canceled_becomes_statement_timeout(conn):
+    conn.error = psycopg2.errors.QueryCanceled("canceling statement due to statement timeout")
+    pool = AsyncPool(min_size=0)
+    with pytest.raises(StatementTimeout):
+        run(lambda: aio.query("Article.find_by_title", "%a%", pool=pool, timeout=100))
+    # The interrupted connection is not reused
+    assert conn.closed and pool._size == 0
+
+
+def test_open_breaker_fails_fast(conn, monkeypatch):
+    tripped = CircuitBreaker(failure_rate=0.5, min_calls=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with tripped.guard():
+            raise psycopg2.OperationalError("server closed the connection")
+    monkeypatch.setattr(aio, "breaker", tripped)
+    with pytest.raises(CircuitOpen):
+        run(lambda: aio.query("Magazine.all", pool=AsyncPool(min_size=0)))
+    assert conn.sent == []
+
+
+def test_breaking_out_of_iter_rows_returns_the_connection(conn):
+    pool = AsyncPool(min_size=0)
+
+    async def first_three():
+        rows = []
+        stream = aio.iter_query("Article.all", pool=pool, batch_size=2)
+        async for row in stream:
+            rows.append(row["id"])
+            if len(rows) == 3:
+                break
+        await stream.aclose()
+        return rows
+
+    assert run(first_three) == [0, 1, 2]
+    assert conn.sent[0] == "BEGIN READ ONLY; "
+    assert conn.sent[1] == "DECLARE aio_rows NO SCROLL CURSOR FOR SELECT * FROM articles ORDER BY id"
+    assert conn.sent[-1] == "ROLLBACK"
+    assert not conn.closed and pool._idle == [conn]
+
+
+def test_each_event_loop_gets_its_own_pool():
+    async def pool():
+        return aio.get_pool()
+
+    first, second = run(pool), run(pool)
+    assert first is not second
@@ -0,0 +1,182 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from lib.db import cache as cache_module
+from lib.db import notify, query
+from lib.db.bloom import BloomFilter, EmailBloom
+from lib.db.cache import MISSING, ModelCache, model_cache
+from lib.db.notify import CacheInvalidator
+from lib.db.query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAuthors:
+    """connection_factory whose authors table is a plain list of emails"""
+
+    def __init__(self, *emails):
+        self.emails = list(emails)
+        self.scans = 0
+
+    def __call__(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.scans += 1
+
+    def fetchall(self):
+        return [{"email": email} for email in self.emails]
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Connected listener and a database with no articles and one author"""
+    loads = []
+
+    def fetch_all(sql, params=None, **kwargs):
+        loads.append((sql, params))
+        return []
+
+    emails = EmailBloom(capacity=100, connection_factory=FakeAuthors("ada@example.com"), clock=Clock())
+    model_cache.clear()
+    monkeypatch.setattr(query, "email_bloom", emails)
+    monkeypatch.setattr(notify, "listening", lambda: True)
+    monkeypatch.setattr(query, "get_router", lambda: SimpleNamespace(sticky=lambda: False))
+    monkeypatch.setattr(query, "primary", contextmanager(lambda: (yield)))
+    monkeypatch.setattr(query, "fetch_all", fetch_all)
+    yield SimpleNamespace(loads=loads, emails=emails)
+    model_cache.clear()
+
+
+# Tests
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    values = [f"author{i}@example.com" for i in range(1000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+
+
+def test_re_adding_does_not_count_twice():
+    bloom = BloomFilter(capacity=100)
+    bloom.add("ada@example.com")
+    bloom.add("ada@example.com")
+    assert bloom.count == 1
+
+
+def test_rebuild_sees_late_commits_and_updated_emails():
+    clock = Clock()
+    authors = FakeAuthors("ada@example.com", "grace@example.com")
+    emails = EmailBloom(capacity=100, max_age=60, connection_factory=authors, clock=clock)
+    assert emails.may_exist("ADA@example.com")
+    assert authors.scans == 1
+    # A lower id commits late, and Author.update changes an email in another process
+    authors.emails = ["ada@example.com", "grace.hopper@example.com", "linus@example.com"]
+    clock.now += 30
+    emails.may_exist("linus@example.com")
+    assert authors.scans == 1
+    clock.now += 31
+    assert emails.may_exist("linus@example.com")
+    assert emails.may_exist("grace.hopper@example.com")
+    assert authors.scans == 2
+
+
+def test_local_add_counts_immediately():
+    emails = EmailBloom(capacity=100, connection_factory=FakeAuthors(), clock=Clock())
+    emails.refresh()
+    assert not emails.may_exist("new@example.com")
+    emails.add("New@example.com")
+    assert emails.may_exist("new@example.com")
+
+
+def test_rebuild_keeps_room_to_grow():
+    authors = FakeAuthors(*(f"a{i}@example.com" for i in range(300)))
+    emails = EmailBloom(capacity=100, connection_factory=authors, clock=Clock())
+    assert emails.refresh() == 300
+    assert emails.capacity == 800
+    assert all(emails.may_exist(f"a{i}@example.com") for i in range(300))
+
+
+def test_negative_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=clock))
+    cache = ModelCache(negative_ttl=30)
+    cache.set_missing("authors", 7)
+    assert cache.get("authors", 7) is MISSING
+    clock.now += 31
+    assert cache.get("authors", 7) is None
+    assert (cache.negative_hits, cache.misses) == (1, 1)
+
+
+def test_set_replaces_negative_entry():
+    cache = ModelCache()
+    cache.set_missing("authors", 7)
+    cache.set("authors", 7, {"id": 7})
+    assert cache.get("authors", 7) == {"id": 7}
+    cache.evict("authors", 7)
+    assert cache.get("authors", 7) is None
+
+
+def test_negative_caching_disabled():
+    cache = ModelCache(negative_ttl=0)
+    cache.set_missing("authors", 7)
+    assert cache.get("authors", 7) is None
+
+
+def test_repeated_misses_do_not_reach_the_database(database):
+    for _ in range(5):
+        assert query.run("Article.find_by_id", 404) == []
+    assert len(database.loads) == 1
+    assert model_cache.get("articles", 404) is MISSING
+
+
+def test_unknown_email_skips_the_query(database):
+    for _ in range(5):
+        assert query.run("Author.find_by_email", "nobody@example.com") == []
+    assert database.loads == []
+    query.run("Author.find_by_email", "ADA@example.com")
+    assert len(database.loads) == 1
+
+
+def test_created_email_is_looked_up(database, monkeypatch):
+    monkeypatch.setattr(query, "execute", lambda sql, params=None, **kwargs: [{"id": 9}])
+    database.emails.refresh()
+    query.run("Author.create", "Grace", "grace@example.com", "bio")
+    query.run("Author.find_by_email", "grace@example.com")
+    assert len(database.loads) == 1
+
+
+def test_notified_author_write_disables_the_filter_until_rebuilt():
+    clock = Clock()
+    emails = EmailBloom(capacity=100, max_age=60, connection_factory=FakeAuthors(), clock=clock)
+    invalidator = CacheInvalidator(cache=ModelCache(), results=QueryCache(), emails=emails)
+    assert not emails.may_exist("linus@example.com")
+    invalidator.handle(json.dumps({"table": "articles", "id": 1, "op": "INSERT"}))
+    assert not emails.may_exist("linus@example.com")
+    invalidator.handle(json.dumps({"table": "authors", "id": 2, "op": "INSERT"}))
+    assert emails.may_exist("linus@example.com")
+    clock.now += 61
+    assert not emails.may_exist("linus@example.com")
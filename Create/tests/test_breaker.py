@@ -0,0 +1,129 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from lib.db import fanout, sharding
+from lib.db.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from lib.db.pool import ConnectionPool, PoolExhausted, PoolTimeout
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def call(breaker, error=None):
+    with breaker.guard():
+        if error is not None:
+            raise error
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        with pytest.raises(psycopg2.OperationalError):
+            call(breaker, psycopg2.OperationalError("server closed the connection"))
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    def _connect(self):
+        return FakeConnection()
+
+
+# Tests
+def test_trips_on_failure_rate_and_fails_fast():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, open_for=5.0, clock=clock)
+    call(breaker)
+    call(breaker)
+    fail(breaker, 1)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as error:
+        call(breaker)
+    assert error.value.retry_after == pytest.approx(5.0)
+    assert breaker.rejected == 1
+
+
+def test_application_errors_do_not_count():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, clock=Clock())
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            call(breaker, ValueError("bad input"))
+    assert breaker.state == CLOSED
+
+
+def test_probe_closes_or_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, open_for=5.0, clock=clock)
+    fail(breaker, 2)
+    clock.now += 5
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    clock.now += 5
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            call(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_old_failures_leave_the_window():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=10.0, clock=clock)
+    fail(breaker, 3)
+    clock.now += 11
+    call(breaker)
+    call(breaker)
+    call(breaker)
+    fail(breaker, 1)
+    assert breaker.state == CLOSED
+
+
+def test_checkout_deadline_and_wait_queue():
+    pool = FakePool({"host": "fake", "port": 5432, "dbname": "articles"}, max_size=1, timeout=0.05, max_waiting=1)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    errors = []
+
+    def wait():
+        try:
+            pool.getconn(0.5)
+        except PoolTimeout as error:
+            errors.append(error)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while pool.waiting == 0:
+        time.sleep(0.001)
+    with pytest.raises(PoolExhausted):
+        pool.getconn()
+    waiter.join()
+    assert type(errors[0]) is PoolTimeout
+    pool.putconn(conn, discard=True)
+
+
+def test_fan_out_and_shards_share_the_breaker(monkeypatch):
+    tripped = CircuitBreaker(failure_rate=0.5, min_calls=2, clock=Clock())
+    fail(tripped, 2)
+    monkeypatch.setattr(fanout, "breaker", tripped)
+    monkeypatch.setattr(sharding, "breaker", tripped)
+    pool = FakePool({"host": "fake", "port": 5432, "dbname": "articles"}, max_size=1)
+    with pytest.raises(CircuitOpen):
+        fanout.fan_out({"one": ("SELECT 1", None, True)}, pool=pool)
+    shards = sharding.ShardedArticles([{"host": "fake", "port": 5433, "dbname": "shard_a"}])
+    with pytest.raises(CircuitOpen):
+        shards.find_by_id(1)
+    assert pool.in_use == 0 and tripped.rejected == 2
@@ -0,0 +1,73 @@
+import json
+import random
+
+import pytest
+from benchmarks.compare import bootstrap_ratio, compare, main, missing
+
+
+def samples(median, spread=0.02, n=50, seed=1):
+    rng = random.Random(seed)
+    return [median * (1 + rng.uniform(-spread, spread)) for _ in range(n)]
+
+
+def run(ms, peak=1000):
+    return {"results": {"10k": {"Article.find_by_id": {
+        "samples_ms": samples(ms),
+        "peak_bytes_samples": [peak] * 10,
+    }}}}
+
+
+# Tests
+def test_interval_brackets_the_ratio():
+    ratio, low, high = bootstrap_ratio(samples(1.0), samples(2.0, seed=2))
+    assert low <= ratio <= high
+    assert ratio == pytest.approx(2.0, rel=0.05)
+
+
+@pytest.mark.parametrize("ms, verdict", [(2.0, "REGRESSION"), (1.0, "ok"), (0.5, "improved")])
+def test_verdicts(ms, verdict):
+    rows = compare(run(1.0), run(ms), resamples=500)
+    assert [(row[2], row[-1]) for row in rows] == [("latency", verdict), ("memory", "ok")]
+
+
+def test_noise_within_threshold_is_not_a_regression():
+    rows = compare(run(1.0), run(1.03), threshold=0.05, resamples=500)
+    assert rows[0][-1] == "ok"
+
+
+def test_methods_missing_from_the_baseline_are_skipped():
+    current = run(1.0)
+    current["results"]["10k"]["Magazine.all"] = current["results"]["10k"]["Article.find_by_id"]
+    assert {row[1] for row in compare(run(1.0), current, resamples=100)} == {"Article.find_by_id"}
+
+
+def test_exit_code(tmp_path, capsys):
+    paths = {}
+    for name, data in (("baseline", run(1.0)), ("same", run(1.0)), ("slower", run(1.0, peak=3000))):
+        paths[name] = tmp_path / f"{name}.json"
+        paths[name].write_text(json.dumps(data))
+    assert main([str(paths["baseline"]), str(paths["same"]), "--resamples", "200"]) == 0
+    assert main([str(paths["baseline"]), str(paths["slower"]), "--resamples", "200"]) == 1
+    assert "1 significant regression(s)" in capsys.readouterr().err
+
+
+def test_missing_lists_what_the_current_run_dropped():
+    baseline = run(1.0)
+    baseline["results"]["10k"]["Magazine.all"] = baseline["results"]["10k"]["Article.find_by_id"]
+    baseline["results"]["100k"] = run(1.0)["results"]["10k"]
+    assert missing(baseline, run(1.0)) == [("10k", "Magazine.all"), ("100k", "Article.find_by_id")]
+    assert missing(run(1.0), baseline) == []
+
+
+def test_missing_method_or_empty_match_fails(tmp_path, capsys):
+    baseline = run(1.0)
+    baseline["results"]["10k"]["Magazine.all"] = baseline["results"]["10k"]["Article.find_by_id"]
+    other_scale = {"results": {"100k": run(1.0)["results"]["10k"]}}
+    paths = {}
+    for name, data in (("baseline", baseline), ("partial", run(1.0)), ("other", other_scale)):
+        paths[name] = tmp_path / f"{name}.json"
+        paths[name].write_text(json.dumps(data))
+    assert main([str(paths["baseline"]), str(paths["partial"]), "--resamples", "200"]) == 1
+    assert "Magazine.all at 10k is in the baseline" in capsys.readouterr().err
+    assert main([str(paths["baseline"]), str(paths["other"]), "--resamples", "200"]) == 1
+    assert "no method and scale in common" in capsys.readouterr().err
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+
+from lib.db import pool as pool_module
+from lib.db.pool import ConnectionPool
+
+CONFIG = {"host": "fake", "port": 5432, "dbname": "articles"}
+
+
+class FakeConnection:
+    autocommit = True
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.closed = False
+        self.close_calls = 0
+
+    def close(self):
+        self.close_calls += 1
+        self.closed = True
+
+    def get_transaction_status(self):
+        return 0
+
+
+class FakePool(ConnectionPool):
+    def _connect(self):
+        return FakeConnection()
+
+
+def use_pool_in_child(pool, idle, busy, results):
+    conn = pool.getconn()
+    pool.putconn(busy)
+    pool.putconn(conn)
+    results.put({
+        "fresh": conn is not idle and conn.pid == os.getpid(),
+        "in_use": pool.in_use,
+        "idle": len(pool._idle),
+        "closed_inherited": idle.close_calls + busy.close_calls,
+        "kept": idle in pool_module._inherited and busy in pool_module._inherited,
+    })
+
+
+# Tests
+def test_forked_child_rebuilds_pool_without_closing_inherited():
+    pool = FakePool(CONFIG, max_size=2)
+    idle = pool.getconn()
+    busy = pool.getconn()
+    pool.putconn(idle)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=use_pool_in_child, args=(pool, idle, busy, results))
+    child.start()
+    result = results.get(timeout=10)
+    child.join(10)
+    assert child.exitcode == 0
+    assert result == {"fresh": True, "in_use": 0, "idle": 1, "closed_inherited": 0, "kept": True}
+    # The parent's pool is untouched
+    assert pool._idle == [idle] and pool.in_use == 1
+    pool.putconn(busy)
+
+
+def test_pid_change_without_fork_hook():
+    pool = FakePool(CONFIG, max_size=1)
+    inherited = pool.getconn()
+    pool.putconn(inherited)
+    pool._pid = -1  # as if forked by a server that bypasses os.register_at_fork
+    conn = pool.getconn()
+    assert conn is not inherited
+    assert inherited.close_calls == 0
+    assert inherited in pool_module._inherited
+    pool.putconn(conn, discard=True)
+
+
+def engine_locks():
+    from lib.db import breaker, cache, instrumentation, metrics, notify, prepared, query_cache, routing
+
+    router = routing.get_router()
+    return {
+        "router": router._lock,
+        "router_singleton": routing._router_lock,
+        "pool_singleton": pool_module._pool_lock,
+        "breaker": breaker.breaker._lock,
+        "query_cache": query_cache.query_cache._lock,
+        "model_cache": cache.model_cache._lock,
+        "prepared": prepared._lock,
+        "metrics_registry": metrics.registry._lock,
+        "checkout_wait_metric": pool_module.CHECKOUT_WAIT._lock,
+        "collector": instrumentation.collector._lock,
+        "listener": notify._listener_lock,
+    }
+
+
+def acquire_engine_locks(results):
+    stuck = [name for name, lock in engine_locks().items() if not lock.acquire(timeout=2)]
+    results.put(stuck)
+
+
+def test_child_does_not_inherit_held_locks():
+    import threading
+
+    locks = engine_locks()
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        for lock in locks.values():
+            lock.acquire()
+        held.set()
+        release.wait()
+        for lock in locks.values():
+            lock.release()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    try:
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        child = context.Process(target=acquire_engine_locks, args=(results,))
+        child.start()
+        stuck = results.get(timeout=30)
+        child.join(10)
+    finally:
+        release.set()
+        holder.join()
+    assert stuck == []
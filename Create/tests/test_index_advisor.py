@@ -0,0 +1,81 @@
+import pytest
+from lib.db.index_advisor import candidates, capture_statements, index_ddl
+
+
+def seq_scan(table, condition=None):
+    node = {"Node Type": "Seq Scan", "Relation Name": table, "Total Cost": 1000.0}
+    if condition is not None:
+        node["Filter"] = condition
+    return node
+
+
+class FakeStatements:
+    """Connection whose pg_stat_statements holds the given rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [{"query": query, "calls": calls, "total_exec_time": total} for query, calls, total in self.rows]
+
+
+# Tests
+@pytest.mark.parametrize("plan, expected", [
+    (seq_scan("articles", "(magazine_id = $1)"), [("articles", ("magazine_id",), "btree")]),
+    (seq_scan("magazines", "((category)::text = $1)"), [("magazines", ("category",), "btree")]),
+    (
+        {"Node Type": "Sort", "Sort Key": ["articles.published_at DESC"], "Plans": [
+            seq_scan("articles", "(author_id = $1)"),
+        ]},
+        [("articles", ("author_id", "published_at"), "btree")],
+    ),
+    ({"Node Type": "Sort", "Sort Key": ["name"], "Plans": [seq_scan("authors")]}, [("authors", ("name",), "btree")]),
+    (seq_scan("articles", "((title)::text ~~* $1)"), [("articles", ("title",), "gin_trgm")]),
+    (seq_scan("authors", "(lower((email)::text) = lower($1))"), [("authors", ("lower(email)",), "btree")]),
+    (seq_scan("authors"), []),
+    ({"Node Type": "Index Scan", "Relation Name": "articles", "Index Cond": "(id = $1)"}, []),
+])
+def test_candidates(plan, expected):
+    assert candidates(plan) == expected
+
+
+def test_scan_under_a_join_is_found():
+    plan = {"Node Type": "Hash Join", "Plans": [
+        seq_scan("articles", "(author_id = $1)"),
+        {"Node Type": "Hash", "Plans": [{"Node Type": "Index Scan", "Relation Name": "magazines"}]},
+    ]}
+    assert candidates(plan) == [("articles", ("author_id",), "btree")]
+
+
+def test_index_ddl():
+    assert index_ddl("articles", ("author_id", "published_at"), "btree") == (
+        "CREATE INDEX ON articles (author_id, published_at)"
+    )
+    assert index_ddl("articles", ("title",), "gin_trgm") == "CREATE INDEX ON articles USING gin (title gin_trgm_ops)"
+    assert index_ddl("authors", ("lower(email)",), "btree") == "CREATE INDEX ON authors (lower(email))"
+
+
+def test_prepared_statements_are_stripped_and_merged():
+    conn = FakeStatements([
+        ("PREPARE model_stmt_1 AS SELECT * FROM articles WHERE magazine_id = $1", 10, 5.0),
+        ("PREPARE model_stmt_7 AS SELECT * FROM articles WHERE magazine_id = $1", 4, 3.0),
+        ("SELECT * FROM authors WHERE id = $1", 2, 1.0),
+        ("SELECT * FROM pg_class", 50, 9.0),
+        ("UPDATE articles SET title = $1 WHERE id = $2", 3, 2.0),
+    ])
+    assert capture_statements(conn) == [
+        ("SELECT * FROM articles WHERE magazine_id = $1", 14, 8.0),
+        ("SELECT * FROM authors WHERE id = $1", 2, 1.0),
+    ]
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from lib.db.connection import APP_DATABASE, DB_CONFIG, get_connection
+from lib.db.queries import QUERIES, is_read
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "lib", "db", "schema.sql")
+
+# These read whole tables by design
+FULL_SCANS = {"Author.all", "Magazine.all", "Article.all", "Author.most_prolific", "Magazine.top_publisher"}
+
+SAMPLE_PARAMS = {
+    "Author.find_by_name": ("%author 4242%",),
+    "Author.find_by_email": ("author4242@example.com",),
+    "Magazine.find_by_name": ("Magazine 42",),
+    "Magazine.find_by_category": ("Category 7",),
+    "Article.find_by_title": ("%article 4242%",),
+}
+
+
+# Fixtures
+@pytest.fixture(scope="module")
+def audit_db():
+    """Schema from schema.sql in a scratch schema, filled to benchmark size"""
+    if DB_CONFIG["dbname"] == APP_DATABASE:
+        pytest.skip(f"creates and drops a schema; set DB_NAME to a scratch database, not {APP_DATABASE}")
+    conn = get_connection()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        # Otherwise schema.sql's CREATE EXTENSION would put it in index_audit, and the teardown drop it
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+        cursor.execute("DROP SCHEMA IF EXISTS index_audit CASCADE")
+        cursor.execute("CREATE SCHEMA index_audit")
+        cursor.execute("SET search_path = index_audit, public")
+        with open(SCHEMA_PATH) as schema:
+            # The DROPs would resolve to the real tables through search_path
+            cursor.execute("".join(
+                line for line in schema if not line.startswith("DROP TABLE")
+            ))
+        cursor.execute("""
+            INSERT INTO authors (name, email)
+            SELECT 'Author ' || i, 'author' || i || '@example.com' FROM generate_series(1, 20000) i
+        """)
+        cursor.execute("""
+            INSERT INTO magazines (name, category)
+            SELECT 'Magazine ' || i, 'Category ' || (i % 200) FROM generate_series(1, 5000) i
+        """)
+        cursor.execute("""
+            INSERT INTO articles (title, content, author_id, magazine_id, published_at, status)
+            SELECT 'Article ' || i, repeat('content ', 20), 1 + i % 20000, 1 + i % 5000,
+                   now() - (i || ' minutes')::interval, 'published'
+            FROM generate_series(1, 200000) i
+        """)
+        cursor.execute("VACUUM ANALYZE")
+    yield conn
+    with conn.cursor() as cursor:
+        cursor.execute("DROP SCHEMA IF EXISTS index_audit CASCADE")
+    conn.close()
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+# Tests
+@pytest.mark.parametrize("name", sorted(n for n in QUERIES if is_read(n) and n not in FULL_SCANS))
+def test_model_query_avoids_seq_scan(audit_db, name):
+    sql = QUERIES[name]
+    params = SAMPLE_PARAMS.get(name, (42,) * sql.count("%s"))
+    with audit_db.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params or None)
+        plan = cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+    scans = [node["Relation Name"] for node in plan_nodes(plan) if node["Node Type"] == "Seq Scan"]
+    assert scans == [], f"{name} seq-scans {scans}"
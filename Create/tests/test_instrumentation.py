@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from lib.db import instrumentation
+from lib.db.instrumentation import HistogramCollector, LatencyHistogram, shape
+
+
+class FakeCursor:
+    rowcount = 2
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def execute(self, sql, params=None):
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def collector():
+    collector = HistogramCollector().install()
+    yield collector
+    collector.uninstall()
+
+
+# Tests
+@pytest.mark.parametrize("micros", [0, 1, 31, 32, 33, 63, 64, 65, 1000, 123456, 10 ** 7])
+def test_bucket_edges_bound_the_value(micros):
+    histogram = LatencyHistogram()
+    bucket = histogram._bucket(micros)
+    upper = histogram._bucket_value(bucket)
+    assert micros < upper
+    # Values below 32 us are exact; above, a bucket is 1/32 of its power of two wide
+    assert upper - micros <= max(1, micros / 32)
+    assert bucket == 0 or histogram._bucket_value(bucket - 1) <= micros
+
+
+def test_buckets_are_ordered():
+    histogram = LatencyHistogram()
+    buckets = [histogram._bucket(micros) for micros in range(0, 100000, 7)]
+    assert buckets == sorted(buckets)
+
+
+def test_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=1 / 32)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=1 / 32)
+    assert histogram.percentile(100) == 1.0
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["min"] == 0.001 and summary["max"] == 1.0
+    assert summary["mean"] == pytest.approx(0.5005)
+
+
+def test_percentile_never_exceeds_max_and_empty_is_zero():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0.0
+    histogram.record(0.000100)
+    assert histogram.percentile(50) == 0.000100
+
+
+def test_shape_hides_literals():
+    assert shape("SELECT *  FROM articles\n WHERE id = 42 AND title = 'it''s'") == (
+        "SELECT * FROM articles WHERE id = ? AND title = ?"
+    )
+
+
+def test_collector_groups_by_shape(collector):
+    with instrumentation.model_method("Article.find_by_id"):
+        instrumentation.execute(FakeCursor(), "SELECT * FROM articles WHERE id = 1")
+        instrumentation.execute(FakeCursor(), "SELECT * FROM articles WHERE id = 2")
+    with pytest.raises(RuntimeError):
+        instrumentation.execute(FakeCursor(RuntimeError("boom")), "SELECT * FROM articles WHERE id = 3")
+    [(statement, summary)] = collector.dump().items()
+    assert statement == "SELECT * FROM articles WHERE id = ?"
+    assert summary["count"] == 3
+    assert summary["methods"] == ["Article.find_by_id"]
+    assert summary["errors"] == 1
+
+
+def test_async_statements_reach_the_hooks(collector):
+    async def statement():
+        await asyncio.sleep(0)
+
+    async def main():
+        with instrumentation.model_method("Magazine.all"):
+            await instrumentation.execute_async(FakeCursor(), "SELECT * FROM magazines", None, None, statement)
+
+    asyncio.run(main())
+    assert collector.dump()["SELECT * FROM magazines"]["methods"] == ["Magazine.all"]
@@ -0,0 +1,144 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from lib.db import instrumentation
+from lib.db import metrics
+from lib.db.metrics import CONTENT_TYPE, Registry, install, install_from_env, serve
+
+
+# Fixtures
+@pytest.fixture
+def registry():
+    """Fresh registry with one metric of each kind"""
+    registry = Registry()
+    requests = registry.counter("app_requests_total", "Requests served", ("method",))
+    requests.inc(method="Article.find_by_id")
+    requests.inc(2, method="Article.find_by_id")
+    registry.gauge("app_in_flight", "Requests in flight").set(4)
+    latency = registry.histogram("app_latency_seconds", "Latency", buckets=(0.01, 0.1))
+    latency.observe(0.005)
+    latency.observe(0.05)
+    latency.observe(3)
+    registry.function("app_pool_connections", "Connections", lambda: {("idle",): 2, ("in_use",): 1}, ("state",))
+    return registry
+
+
+@pytest.fixture
+def server(registry):
+    server = serve(port=0, registry=registry)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def new_hooks():
+    """The after-hooks a test adds, removed again afterwards"""
+    before = list(instrumentation._after_hooks)
+    yield
+    for hook in [hook for hook in instrumentation._after_hooks if hook not in before]:
+        instrumentation.remove_hook(after=hook)
+
+
+# Tests
+def test_render_text_format(registry):
+    text = registry.render()
+    assert "# TYPE app_requests_total counter" in text
+    assert 'app_requests_total{method="Article.find_by_id"} 3' in text
+    assert "app_in_flight 4" in text
+    assert 'app_pool_connections{state="idle"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    lines = registry.render().splitlines()
+    assert 'app_latency_seconds_bucket{le="0.01"} 1' in lines
+    assert 'app_latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'app_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "app_latency_seconds_count 3" in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("escaped_total", "Escaping", ("shape",)).inc(shape='say "hi"\n')
+    assert 'escaped_total{shape="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_wrong_labels_rejected():
+    counter = Registry().counter("labelled_total", "Labelled", ("method",))
+    with pytest.raises(ValueError):
+        counter.inc(table="articles")
+
+
+def test_scrape_over_http(server, registry):
+    host, port = server.server_address
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+        assert response.status == 200
+        assert response.headers["Content-Type"] == CONTENT_TYPE
+        assert response.read().decode("utf-8") == registry.render()
+
+
+def test_unknown_path_is_404(server):
+    host, port = server.server_address
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"http://{host}:{port}/other")
+    assert error.value.code == 404
+
+
+def test_pools_on_one_server_are_separate_series():
+    from lib.db.metrics import registry as default_registry
+    from lib.db.pool import ConnectionPool
+
+    config = {"host": "metrics-test", "port": 5432, "dbname": "articles"}
+    primary = ConnectionPool(config, max_size=10)
+    explain = ConnectionPool(config, max_size=1, role="slowlog-explain")
+    again = ConnectionPool(config, max_size=3)
+    text = default_registry.render()
+    assert 'articles_pool_max_connections{pool="primary:metrics-test:5432/articles"} 10' in text
+    assert 'articles_pool_max_connections{pool="slowlog-explain:metrics-test:5432/articles"} 1' in text
+    assert 'articles_pool_max_connections{pool="primary:metrics-test:5432/articles#2"} 3' in text
+    for pool in (primary, explain, again):
+        pool.closeall()
+
+
+def test_install_once_per_registry(new_hooks):
+    first, second = Registry(), Registry()
+    count = len(instrumentation._after_hooks)
+    install(first)
+    install(first)
+    assert len(instrumentation._after_hooks) == count + 1
+    install(second)
+    assert len(instrumentation._after_hooks) == count + 2
+    assert "articles_query_duration_seconds" in second.render()
+
+
+def test_install_from_env_is_off_by_default(monkeypatch, new_hooks):
+    monkeypatch.delenv("ARTICLES_METRICS", raising=False)
+    monkeypatch.delenv("ARTICLES_METRICS_PORT", raising=False)
+    monkeypatch.setattr(metrics, "install", lambda registry=None: pytest.fail("installed"))
+    assert install_from_env() is None
+
+
+def test_install_from_env_serves_the_default_registry(monkeypatch):
+    installed = []
+    monkeypatch.setenv("ARTICLES_METRICS_PORT", "0")
+    monkeypatch.setattr(metrics, "install", lambda registry=metrics.registry: installed.append(registry))
+    server = install_from_env()
+    try:
+        host, port = server.server_address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert installed == [metrics.registry]
+
+
+def test_install_from_env_without_port_only_installs(monkeypatch):
+    installed = []
+    monkeypatch.setenv("ARTICLES_METRICS", "1")
+    monkeypatch.delenv("ARTICLES_METRICS_PORT", raising=False)
+    monkeypatch.setattr(metrics, "install", lambda registry=metrics.registry: installed.append(registry))
+    assert install_from_env() is None
+    assert installed == [metrics.registry]
@@ -0,0 +1,102 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from lib.db import notify, query
+from lib.db.cache import ModelCache, model_cache
+from lib.db.notify import CacheInvalidator
+from lib.db.query_cache import QueryCache, query_cache
+
+SQL = "SELECT * FROM magazines ORDER BY id"
+
+
+@pytest.fixture
+def invalidator():
+    invalidator = CacheInvalidator(cache=ModelCache(), results=QueryCache())
+    invalidator.cache.set("authors", 7, {"id": 7})
+    invalidator.cache.set("magazines", 3, {"id": 3})
+    invalidator.results.put(SQL, (), [{"id": 3}])
+    return invalidator
+
+
+def change(table, row_id, op="UPDATE"):
+    return json.dumps({"table": table, "id": row_id, "op": op})
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Connected listener, no sticky session, and reads counted instead of run"""
+    loads = []
+
+    def fetch_all(sql, params=None, **kwargs):
+        loads.append(params)
+        return [{"id": params[0], "name": "Ada"}]
+
+    model_cache.clear()
+    query_cache.clear()
+    monkeypatch.setattr(notify, "listening", lambda: True)
+    monkeypatch.setattr(query, "get_router", lambda: SimpleNamespace(sticky=lambda: False))
+    monkeypatch.setattr(query, "primary", contextmanager(lambda: (yield)))
+    monkeypatch.setattr(query, "fetch_all", fetch_all)
+    yield loads
+    model_cache.clear()
+    query_cache.clear()
+
+
+# Tests
+def test_delete_evicts_the_row_and_outdates_results(invalidator):
+    invalidator.handle(change("magazines", 3, op="DELETE"))
+    assert invalidator.cache.get("magazines", 3) is None
+    assert invalidator.cache.get("authors", 7) == {"id": 7}
+    assert invalidator.results.get(SQL, ()) is None
+
+
+def test_unknown_table_leaves_other_rows_alone(invalidator):
+    invalidator.handle(change("subscriptions", 7))
+    assert invalidator.cache.get("authors", 7) == {"id": 7}
+    assert invalidator.results.get(SQL, ()) == [{"id": 3}]
+
+
+@pytest.mark.parametrize("payload", ["not json", json.dumps({"table": "authors"}), json.dumps([1, 2])])
+def test_bad_payload_drops_everything(invalidator, payload):
+    invalidator.handle(payload)
+    assert len(invalidator.cache) == 0
+    assert invalidator.results.get(SQL, ()) is None
+
+
+def test_listener_is_not_trusted_until_connected(monkeypatch):
+    started = []
+    listener = SimpleNamespace(connected=SimpleNamespace(is_set=lambda: False), is_alive=lambda: True)
+    monkeypatch.setattr(notify, "_listener", None)
+    monkeypatch.setattr(notify, "start_listener", lambda: started.append(1) or listener)
+    assert notify.listening() is False
+    assert started == [1]
+
+
+def test_find_by_id_is_served_from_the_model_cache(database):
+    assert query.run("Author.find_by_id", 7) == [{"id": 7, "name": "Ada"}]
+    assert query.run("Article.author", 7) == [{"id": 7, "name": "Ada"}]
+    assert database == [(7,)]
+    # Another process updates author 7
+    CacheInvalidator().handle(change("authors", 7))
+    query.run("Author.find_by_id", 7)
+    assert database == [(7,), (7,)]
+
+
+def test_write_during_load_is_not_cached(database, monkeypatch):
+    def fetch_all(sql, params=None, **kwargs):
+        database.append(params)
+        query_cache.bump("authors")
+        return [{"id": 7, "name": "Ada"}]
+
+    monkeypatch.setattr(query, "fetch_all", fetch_all)
+    query.run("Author.find_by_id", 7)
+    assert model_cache.get("authors", 7) is None
+
+
+def test_sticky_session_reads_the_database(database, monkeypatch):
+    monkeypatch.setattr(query, "get_router", lambda: SimpleNamespace(sticky=lambda: True))
+    query.run("Author.find_by_id", 7)
+    query.run("Author.find_by_id", 7)
+    assert len(database) == 2
@@ -0,0 +1,63 @@
+import warnings
+
+import pytest
+from lib.db import instrumentation
+from lib.db.nplusone import NPlusOneError, NPlusOneWarning, detect
+
+SQL = "SELECT * FROM authors WHERE id = %s"
+
+
+class FakeCursor:
+    rowcount = 1
+
+    def execute(self, sql, params=None):
+        pass
+
+
+def find_author(author_id):
+    with instrumentation.model_method("Author.find_by_id"):
+        instrumentation.execute(FakeCursor(), SQL, (author_id,))
+
+
+# Tests
+def test_warns_once_above_threshold():
+    with pytest.warns(NPlusOneWarning) as caught:
+        with detect(threshold=3):
+            for author_id in range(10):
+                find_author(author_id)
+    [warning] = [w for w in caught if w.category is NPlusOneWarning]
+    message = str(warning.message)
+    assert "Author.find_by_id ran 4 times" in message
+    assert "WHERE id = ANY(%s)" in message
+    assert __file__ in message
+
+
+def test_repeats_with_the_same_params_are_not_reported():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with detect(threshold=3):
+            for _ in range(10):
+                find_author(7)
+            for author_id in range(2):
+                find_author(author_id)
+
+
+def test_raise_mode():
+    with pytest.raises(NPlusOneError, match="Author.find_by_id ran 3 times"):
+        with detect(threshold=2, action="raise"):
+            for author_id in range(3):
+                find_author(author_id)
+
+
+def test_only_inside_the_block():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with detect(threshold=1):
+            find_author(1)
+        for author_id in range(5):
+            find_author(author_id)
+
+
+def test_rejects_unknown_action():
+    with pytest.raises(ValueError):
+        detect(action="log")
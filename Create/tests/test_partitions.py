@@ -0,0 +1,59 @@
+import re
+from datetime import date
+
+import pytest
+from lib.db.partitions import prune
+from lib.db.queries import QUERIES, tables_in
+
+SINCE = date(2026, 1, 1)
+UNTIL = date(2026, 7, 1)
+
+
+def placeholder_params(sql):
+    return tuple(f"p{i}" for i in range(sql.count("%s")))
+
+
+# Tests
+@pytest.mark.parametrize("name", sorted(QUERIES))
+@pytest.mark.parametrize("until", [None, UNTIL])
+def test_prune_every_catalog_statement(name, until):
+    sql = QUERIES[name]
+    params = placeholder_params(sql)
+    pruned, pruned_params = prune(sql, params, SINCE, until)
+    if not sql.startswith("SELECT") or "articles" not in tables_in(sql):
+        assert (pruned, pruned_params) == (sql, params)
+        return
+    assert pruned.count("%s") == len(pruned_params)
+    assert pruned.count("(") == pruned.count(")")
+    assert pruned.count(" WHERE ") == 1
+    where = pruned.index(" WHERE ")
+    for keyword in (" GROUP BY ", " HAVING ", " ORDER BY ", " LIMIT "):
+        if keyword in pruned:
+            assert pruned.index(keyword) > where
+            assert "published_at >=" not in pruned[pruned.index(keyword):]
+    # Bounds land where their placeholders are, the original params keep their order
+    bounds = (SINCE,) + ((UNTIL,) if until else ())
+    assert [p for p in pruned_params if p not in bounds] == list(params)
+    column = "a.published_at" if re.search(r"\barticles a\b", sql) else "published_at"
+    assert f"WHERE {column} >= %s" in pruned
+
+
+def test_prune_grouped_statement():
+    sql = QUERIES["Magazine.contributing_authors"]
+    pruned, params = prune(sql, (7,), SINCE, UNTIL)
+    assert pruned == (
+        "SELECT au.* FROM authors au JOIN articles a ON a.author_id = au.id "
+        "WHERE a.published_at >= %s AND a.published_at < %s AND (a.magazine_id = %s) "
+        "GROUP BY au.id HAVING COUNT(a.id) > 2"
+    )
+    assert params == (SINCE, UNTIL, 7)
+
+
+def test_prune_statement_without_where():
+    pruned, params = prune(QUERIES["Magazine.top_publisher"], (), SINCE)
+    assert pruned == (
+        "SELECT m.*, COUNT(a.id) AS article_count FROM magazines m "
+        "JOIN articles a ON a.magazine_id = m.id WHERE a.published_at >= %s "
+        "GROUP BY m.id ORDER BY article_count DESC LIMIT 1"
+    )
+    assert params == (SINCE,)
@@ -0,0 +1,86 @@
+import psycopg2.errors
+import pytest
+from lib.db import prepared
+from lib.db.prepared import execute, to_server_params
+
+
+class FakeConnection:
+    autocommit = True
+
+    def __init__(self):
+        self.server_statements = set()
+
+
+class FakeCursor:
+    """Records what reaches the server after psycopg2's %-interpolation"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sent = []
+
+    def execute(self, sql, params=None):
+        if params is not None:
+            sql = sql % tuple(repr(p) for p in params)
+        self.sent.append(sql)
+        for part in sql.split("; "):
+            words = part.split()
+            if words[0] == "PREPARE":
+                self.connection.server_statements.add(words[1])
+            elif words[0] == "EXECUTE" and words[1] not in self.connection.server_statements:
+                raise psycopg2.errors.InvalidSqlStatementName(f"prepared statement {words[1]} does not exist")
+
+
+@pytest.fixture
+def cursor():
+    return FakeCursor(FakeConnection())
+
+
+# Tests
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM authors WHERE id = %s", ("SELECT * FROM authors WHERE id = $1", 1)),
+    ("UPDATE authors SET name = %s WHERE id = %s", ("UPDATE authors SET name = $1 WHERE id = $2", 2)),
+    ("SELECT * FROM articles WHERE title LIKE 'a%%' AND id = %s",
+     ("SELECT * FROM articles WHERE title LIKE 'a%' AND id = $1", 1)),
+    ("SELECT * FROM magazines", ("SELECT * FROM magazines", 0)),
+])
+def test_to_server_params(sql, expected):
+    assert to_server_params(sql) == expected
+
+
+def test_literal_percent_without_params(cursor):
+    execute(cursor, "SELECT * FROM articles WHERE title LIKE 'x%%'")
+    [sent] = cursor.sent
+    assert sent.startswith("PREPARE model_stmt_")
+    assert "LIKE 'x%'" in sent and "%%" not in sent
+
+
+def test_literal_percent_with_params(cursor):
+    execute(cursor, "SELECT * FROM articles WHERE title LIKE 'x%%' AND id = %s", (7,))
+    [sent] = cursor.sent
+    assert "LIKE 'x%' AND id = $1" in sent
+    assert sent.endswith("(7)")
+
+
+def test_second_call_executes_by_name(cursor):
+    execute(cursor, "SELECT * FROM authors WHERE id = %s", (1,), prefix="SET LOCAL statement_timeout = 50; ")
+    execute(cursor, "SELECT * FROM authors WHERE id = %s", (2,))
+    assert cursor.sent[1].startswith("EXECUTE model_stmt_") and cursor.sent[1].endswith("(2)")
+    assert cursor.sent[0].startswith("SET LOCAL statement_timeout = 50; PREPARE")
+
+
+def test_reset_session_is_prepared_again(cursor):
+    before = dict(prepared.stats)
+    execute(cursor, "SELECT * FROM authors WHERE id = %s", (1,))
+    cursor.connection.server_statements.clear()  # DISCARD ALL behind our back
+    execute(cursor, "SELECT * FROM authors WHERE id = %s", (2,))
+    assert cursor.sent[-1].startswith("PREPARE")
+    assert prepared.stats["resets"] == before["resets"] + 1
+    assert prepared.stats["prepared"] == before["prepared"] + 2
+
+
+def test_reset_session_inside_a_transaction_raises(cursor):
+    execute(cursor, "SELECT * FROM authors WHERE id = %s", (1,))
+    cursor.connection.server_statements.clear()
+    cursor.connection.autocommit = False
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        execute(cursor, "SELECT * FROM authors WHERE id = %s", (2,))
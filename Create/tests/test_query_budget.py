@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from lib.db import instrumentation, query
+from lib.db.testing import QueryBudgetExceeded, count_queries
+
+
+class FakeCursor:
+    rowcount = 1
+    description = None
+
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    autocommit = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def fake_database(monkeypatch):
+    """Route lib.db.query reads to a connection that answers every statement with no rows"""
+    conn = FakeConnection()
+
+    @contextmanager
+    def read_connection():
+        yield conn
+
+    monkeypatch.setattr(query, "get_router", lambda: SimpleNamespace(read_connection=read_connection))
+    return conn
+
+
+def issue(times, method="Article.author"):
+    with instrumentation.model_method(method):
+        for i in range(times):
+            instrumentation.execute(FakeCursor(), "SELECT * FROM authors WHERE id = %s", (i,))
+
+
+# Tests
+def test_within_budget(assert_max_queries):
+    with assert_max_queries(3) as counter:
+        issue(3)
+    assert counter.count == 3
+
+
+def test_over_budget_lists_statements(assert_max_queries):
+    with pytest.raises(QueryBudgetExceeded, match="4 queries issued, budget was 2") as error:
+        with assert_max_queries(2):
+            issue(4)
+    assert "Article.author: SELECT * FROM authors WHERE id = %s" in str(error.value)
+
+
+def test_nested_scopes_count_independently(assert_max_queries):
+    with count_queries() as outer:
+        issue(1)
+        with assert_max_queries(2) as inner:
+            issue(2)
+    assert inner.count == 2
+    assert outer.count == 3
+
+
+def test_statements_outside_scope_not_counted():
+    issue(2)
+    with count_queries() as counter:
+        pass
+    assert counter.count == 0
+
+
+@pytest.mark.parametrize("name", ["Author.articles", "Author.magazines", "Magazine.contributing_authors"])
+def test_relationship_is_one_round_trip(fake_database, assert_max_queries, name):
+    with assert_max_queries(1) as counter:
+        query.run(name, 1)
+    assert counter.statements == [(name, instrumentation.shape(query.QUERIES[name]))]
+
+
+def test_relationship_in_a_loop_breaks_budget(fake_database, assert_max_queries):
+    with pytest.raises(QueryBudgetExceeded, match="3 queries issued, budget was 1"):
+        with assert_max_queries(1):
+            for author_id in (1, 2, 3):
+                query.run("Article.author", author_id)
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from lib.db import notify, query
+from lib.db.query_cache import QueryCache, query_cache
+
+SQL = "SELECT * FROM magazines WHERE category = %s ORDER BY id"
+
+
+def rows(*ids):
+    return [{"id": i, "name": f"Magazine {i}", "category": "Technology"} for i in ids]
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+# Tests
+def test_hit_returns_equal_rows():
+    cache = QueryCache()
+    cache.put(SQL, ("Technology",), rows(1, 2))
+    assert cache.get(SQL, ("Technology",)) == rows(1, 2)
+    assert cache.get(SQL, ("Science",)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_none_params_are_empty():
+    cache = QueryCache()
+    cache.put("SELECT * FROM magazines ORDER BY id", None, rows(1))
+    assert cache.get("SELECT * FROM magazines ORDER BY id", None) == rows(1)
+    assert cache.get("SELECT * FROM magazines ORDER BY id", ()) == rows(1)
+
+
+def test_bump_makes_entry_stale():
+    cache = QueryCache()
+    cache.put(SQL, ("Technology",), rows(1))
+    cache.bump("authors")
+    assert cache.get(SQL, ("Technology",)) == rows(1)
+    cache.bump("magazines")
+    assert cache.get(SQL, ("Technology",)) is None
+    assert cache.stale == 1
+    assert len(cache._entries) == 0
+
+
+def test_write_during_load_is_not_cached_as_fresh():
+    cache = QueryCache()
+
+    def loader(sql, params):
+        cache.bump("magazines")  # a write commits while the query runs
+        return rows(1)
+
+    assert cache.fetch(SQL, ("Technology",), loader) == rows(1)
+    assert cache.get(SQL, ("Technology",)) is None
+
+
+def test_clear_outdates_loads_in_flight():
+    cache = QueryCache()
+
+    def loader(sql, params):
+        cache.clear()  # the listener reconnected while the query ran
+        return rows(1)
+
+    cache.fetch(SQL, ("Technology",), loader)
+    assert cache.get(SQL, ("Technology",)) is None
+
+
+def test_byte_budget_evicts_least_recently_used():
+    probe = QueryCache()
+    probe.put(SQL, ("a",), rows(1))
+    entry_size = probe.bytes
+    cache = QueryCache(max_bytes=entry_size * 2 + entry_size // 2)
+    cache.put(SQL, ("a",), rows(1))
+    cache.put(SQL, ("b",), rows(1))
+    cache.get(SQL, ("a",))
+    cache.put(SQL, ("c",), rows(1))
+    assert cache.get(SQL, ("b",)) is None
+    assert cache.get(SQL, ("a",)) == rows(1)
+    assert cache.get(SQL, ("c",)) == rows(1)
+    assert cache.evictions == 1
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_oversized_result_is_not_cached():
+    cache = QueryCache(max_bytes=100)
+    cache.put(SQL, ("a",), rows(*range(50)))
+    assert cache.bytes == 0 and cache.get(SQL, ("a",)) is None
+
+
+def test_run_serves_cached_methods_from_cache(monkeypatch):
+    loads = []
+
+    def fetch_all(sql, params=None, **kwargs):
+        loads.append(params)
+        return rows(1)
+
+    monkeypatch.setattr(query, "fetch_all", fetch_all)
+    monkeypatch.setattr(query, "primary", contextmanager(lambda: (yield)))
+    monkeypatch.setattr(notify, "listening", lambda: True)
+    assert query.run("Magazine.find_by_category", "Technology") == rows(1)
+    assert query.run("Magazine.find_by_category", "Technology") == rows(1)
+    assert loads == [("Technology",)]
+    query_cache.bump("magazines")
+    query.run("Magazine.find_by_category", "Technology")
+    assert len(loads) == 2
+
+
+def test_run_bypasses_cache_inside_transaction(monkeypatch):
+    loads = []
+    monkeypatch.setattr(query, "fetch_all", lambda sql, params=None, **kwargs: loads.append(params) or rows(1))
+    token = query._current.set((SimpleNamespace(), set(), [None]))
+    try:
+        query.run("Magazine.all")
+        query.run("Magazine.all")
+    finally:
+        query._current.reset(token)
+    assert len(loads) == 2
+
+
+def test_run_bypasses_cache_until_listener_is_connected(monkeypatch):
+    loads = []
+    monkeypatch.setattr(query, "fetch_all", lambda sql, params=None, **kwargs: loads.append(params) or rows(1))
+    monkeypatch.setattr(notify, "listening", lambda: False)
+    query.run("Magazine.all")
+    query.run("Magazine.all")
+    assert len(loads) == 2
+
+
+def test_uncached_reads_the_database(monkeypatch):
+    loads = []
+    monkeypatch.setattr(query, "fetch_all", lambda sql, params=None, **kwargs: loads.append(params) or rows(1))
+    monkeypatch.setattr(notify, "listening", lambda: True)
+    with query.uncached():
+        query.run("Magazine.all")
+        query.run("Magazine.all")
+    assert len(loads) == 2
+
+
+def test_benchmark_save_writes_the_row_back_unchanged(monkeypatch):
+    from benchmarks import cases
+
+    row = {"id": 5, "title": "Seeded title", "content": "x" * 2500, "author_id": 3, "magazine_id": 4}
+    monkeypatch.setattr(cases, "run", lambda name, *params: [row])
+    assert cases._update_args(SimpleNamespace(randint=lambda a, b: 5), {"articles": 10}) == (
+        "Seeded title", "x" * 2500, 3, 4, 5,
+    )
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+from lib.db import routing
+from lib.db.routing import ReplicaRouter, primary
+
+CONFIG = {"host": "fake", "port": 5432, "dbname": "articles"}
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, name):
+        self.name = name
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.in_use = 0
+        self.discarded = 0
+
+    def getconn(self):
+        if self.fail:
+            raise psycopg2.OperationalError(f"{self.name} is down")
+        self.in_use += 1
+        return FakeConnection(self.name)
+
+    def putconn(self, conn, discard=False):
+        self.in_use -= 1
+        self.discarded += discard
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """Router over two fake replicas, with a fake primary pool"""
+    primary_pool = FakePool("primary")
+    monkeypatch.setattr(routing, "get_pool", lambda: primary_pool)
+    router = ReplicaRouter(sticky_seconds=5.0, retry_after=10.0)
+    router.pools = [FakePool("replica0"), FakePool("replica1")]
+    router._cycle = iter([0, 1] * 100)
+    # mark_write() sets a context variable that would outlive the test
+    token = routing._last_write.set(None)
+    yield router
+    routing._last_write.reset(token)
+
+
+def read(router):
+    with router.read_connection() as conn:
+        return conn.name
+
+
+# Tests
+def test_round_robin(router):
+    assert [read(router) for _ in range(4)] == ["replica0", "replica1", "replica0", "replica1"]
+
+
+def test_least_connections_picks_the_idlest(router):
+    router.strategy = "least_connections"
+    router.pools[0].in_use = 3
+    assert read(router) == "replica1"
+    router.pools[1].in_use = 5
+    assert read(router) == "replica0"
+
+
+def test_reads_stick_to_the_primary_after_a_write(router, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: clock[0])
+    router.mark_write()
+    assert read(router) == "primary"
+    clock[0] += 4.9
+    assert read(router) == "primary"
+    clock[0] += 0.2
+    assert read(router) == "replica0"
+
+
+def test_primary_block_forces_the_primary(router):
+    with primary():
+        assert read(router) == "primary"
+    assert read(router) == "replica0"
+
+
+def test_down_replica_falls_back_and_is_skipped(router, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: clock[0])
+    router.pools[0].fail = True
+    assert read(router) == "primary"
+    # replica0 is skipped until retry_after passes
+    assert [read(router) for _ in range(2)] == ["replica1", "replica1"]
+    router.pools[0].fail = False
+    clock[0] += 10
+    assert read(router) == "replica0"
+
+
+def test_every_replica_down_uses_the_primary(router):
+    router.mark_down(0)
+    router.mark_down(1)
+    assert read(router) == "primary"
+
+
+def test_connection_error_marks_the_replica_down(router):
+    with pytest.raises(psycopg2.OperationalError):
+        with router.read_connection():
+            raise psycopg2.OperationalError("server closed the connection")
+    assert router.pools[0].discarded == 1
+    assert read(router) == "replica1"
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        ReplicaRouter(strategy="random")
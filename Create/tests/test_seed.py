@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+from lib.db import seed as seed_module
+from lib.db.seed import CHUNK_SIZE, generate_articles, generate_authors, generate_magazines, seed
+
+ANCHOR = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TOTAL = 2 * CHUNK_SIZE + 100
+
+
+def load(total, seed_value, chunks):
+    rows = {}
+    for chunk in chunks:
+        rows.update((row[0], row) for row in generate_articles(chunk, total, seed_value, ANCHOR))
+    return [rows[article_id] for article_id in sorted(rows)]
+
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+
+class FakeConnection:
+    closed = False
+    autocommit = False
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    """Runs seed() with no articles against a connection that only records statements"""
+    conn = FakeConnection()
+    triggers = []
+    monkeypatch.setattr(seed_module, "get_connection", lambda: conn)
+    monkeypatch.setattr(seed_module, "copy_rows", lambda conn, table, columns, rows: len(list(rows)))
+    monkeypatch.setattr(seed_module, "_set_user_triggers", lambda conn, enabled: triggers.append(enabled))
+
+    def run(**kwargs):
+        seed(0, workers=1, anchor=ANCHOR, log=lambda message: None, **kwargs)
+        return triggers
+
+    return run
+
+
+# Tests
+def test_two_runs_yield_the_same_rows():
+    first = load(TOTAL, 7, range(3))
+    seed_module._sentence_pools.clear()
+    assert load(TOTAL, 7, range(3)) == first
+    assert len(first) == TOTAL
+
+
+def test_rows_do_not_depend_on_chunk_order_or_worker():
+    first = load(TOTAL, 7, range(3))
+    chunks = list(range(3))
+    random.Random(1).shuffle(chunks)
+    # A fresh worker computes its own weights and sentence pool
+    seed_module._sentence_pools.clear()
+    assert load(TOTAL, 7, chunks) == first
+    assert load(TOTAL, 7, [2]) == first[2 * CHUNK_SIZE:]
+
+
+def test_seed_changes_the_rows():
+    assert load(1_000, 1, [0]) != load(1_000, 2, [0])
+    assert list(generate_authors(50, 1)) != list(generate_authors(50, 2))
+
+
+def test_authors_and_magazines_are_reproducible():
+    assert list(generate_authors(50, 3)) == list(generate_authors(50, 3))
+    assert list(generate_magazines(20, 3)) == list(generate_magazines(20, 3))
+
+
+def test_triggers_stay_on_without_truncate(loader):
+    assert loader() == []
+
+
+def test_truncate_disables_and_restores_triggers(loader):
+    assert loader(truncate=True) == [False, True]
+
+
+def test_triggers_can_be_disabled_explicitly(loader):
+    assert loader(disable_triggers=True) == [False, True]
+
+
+def test_truncate_can_keep_triggers_on(loader):
+    assert loader(truncate=True, disable_triggers=False) == []
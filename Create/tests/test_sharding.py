@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from lib.db.queries import QUERIES
+from lib.db.sharding import ARTICLE_COLUMNS, HashRing, ShardedArticles, _move_magazine
+
+SHARDS = [
+    {"host": "fake", "port": 5432, "dbname": "shard_a"},
+    {"host": "fake", "port": 5433, "dbname": "shard_b"},
+]
+
+
+def at(day):
+    return datetime(2026, 1, day, tzinfo=timezone.utc)
+
+
+# Tests
+def test_find_by_author_merges_newest_first(monkeypatch):
+    articles = ShardedArticles(SHARDS)
+    shard_rows = {
+        id(articles.pools[0]): [{"id": 1, "published_at": at(3)}, {"id": 4, "published_at": None}],
+        id(articles.pools[1]): [{"id": 2, "published_at": at(9)}, {"id": 3, "published_at": at(1)}],
+    }
+    monkeypatch.setattr(articles, "_query", lambda pool, sql, params=None: shard_rows[id(pool)])
+    try:
+        # Same order as Author.articles on an unsharded database: published_at DESC, NULLs first
+        assert [row["id"] for row in articles.find_by_author(7)] == [4, 2, 1, 3]
+    finally:
+        articles.closeall()
+
+
+def test_ring_is_stable_when_a_shard_is_added():
+    old = HashRing(["a", "b"])
+    new = HashRing(["a", "b", "c"])
+    moved = sum(old.names[old.lookup(m)] != new.names[new.lookup(m)] for m in range(3000))
+    assert moved < 1500
+
+
+class Shard:
+    """Connection, cursor and pool over an in-memory articles table"""
+
+    def __init__(self, rows=(), on_commit=None):
+        self.rows = {row["id"]: dict(row) for row in rows}
+        self.on_commit = on_commit
+        self.autocommit = True
+        self._result = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT"):
+            self._result = [dict(row) for row in self.rows.values() if row["magazine_id"] == params[0]]
+        elif sql.startswith("DELETE") and "id = ANY" in sql:
+            for article_id in params[0]:
+                self.rows.pop(article_id, None)
+        elif sql.startswith("DELETE"):
+            self.rows = {k: row for k, row in self.rows.items() if row["magazine_id"] != params[0]}
+
+    def executemany(self, sql, rows):
+        for values in rows:
+            row = dict(zip(ARTICLE_COLUMNS, values))
+            self.rows.setdefault(row["id"], row)
+
+    def fetchmany(self, size):
+        rows, self._result = self._result[:size], self._result[size:]
+        return rows
+
+    def commit(self):
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def rollback(self):
+        pass
+
+
+def article(article_id, magazine_id):
+    return {**dict.fromkeys(ARTICLE_COLUMNS), "id": article_id, "magazine_id": magazine_id}
+
+
+def test_move_keeps_rows_inserted_during_the_copy():
+    src = Shard([article(1, 7), article(2, 7), article(3, 8)])
+    # Another process inserts into magazine 7 after the SELECT, before the DELETE
+    target = Shard(on_commit=lambda: src.rows.setdefault(4, article(4, 7)))
+    columns = ", ".join(ARTICLE_COLUMNS)
+    placeholders = ", ".join(["%s"] * len(ARTICLE_COLUMNS))
+    assert _move_magazine(src, target, 7, columns, placeholders, batch_size=1) == 2
+    assert sorted(target.rows) == [1, 2]
+    # Still on the old shard, where the next run picks it up
+    assert sorted(src.rows) == [3, 4]
+    assert src.autocommit
+
+
+
+def test_on_magazine_refuses_joins_with_primary_tables():
+    articles = ShardedArticles(SHARDS)
+    try:
+        with pytest.raises(ValueError, match="authors"):
+            articles.on_magazine(7, QUERIES["Magazine.contributors"], (7,))
+    finally:
+        articles.closeall()
@@ -0,0 +1,74 @@
+import json
+from datetime import date
+
+import pytest
+from lib.db import instrumentation, slowlog
+from lib.db.instrumentation import QueryEvent
+from lib.db.slowlog import SlowQueryLog, redact
+
+
+def event(duration, sql="SELECT * FROM articles WHERE title ILIKE %s", params=("%secret%",), error=None):
+    event = QueryEvent(sql, params, "Article.find_by_title")
+    event.duration = duration
+    event.rowcount = 3
+    event.error = error
+    return event
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = SlowQueryLog(str(tmp_path / "slow.jsonl"), threshold_ms=100, explain_sample_rate=0)
+    yield log
+    log.uninstall()
+
+
+# Tests
+def test_redact_keeps_numbers_and_hides_text():
+    assert redact((7, 2.5, True, None, "ada@example.com", date(2026, 1, 1))) == [
+        7, 2.5, True, None, "<str len=15>", "<date>",
+    ]
+    assert redact({"id": 7, "email": "ada@example.com"}) == {"id": 7, "email": "<str len=15>"}
+    assert redact(None) is None
+
+
+def test_only_statements_over_threshold_are_logged(log, tmp_path):
+    log(event(0.05))
+    log(event(0.25))
+    [record] = records(tmp_path / "slow.jsonl")
+    assert record["type"] == "slow_query"
+    assert record["method"] == "Article.find_by_title"
+    assert record["shape"] == "SELECT * FROM articles WHERE title ILIKE %s"
+    assert record["params"] == ["<str len=8>"]
+    assert record["duration_ms"] == 250.0
+    assert record["rowcount"] == 3
+    assert record["error"] is None
+    assert "secret" not in (tmp_path / "slow.jsonl").read_text()
+
+
+def test_writes_are_never_explained(log, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(log, "_schedule_explain", lambda record_id, event: scheduled.append(event.sql))
+    log.explain_sample_rate = 1.0
+    log(event(0.5, sql="DELETE FROM articles WHERE id = %s", params=(1,)))
+    log(event(0.5, error=RuntimeError("boom")))
+    log(event(0.5))
+    assert scheduled == ["SELECT * FROM articles WHERE title ILIKE %s"]
+
+
+def test_install_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("ARTICLES_SLOW_QUERY_MS", raising=False)
+    assert slowlog.install_from_env() is None
+    monkeypatch.setenv("ARTICLES_SLOW_QUERY_MS", "10")
+    monkeypatch.setenv("ARTICLES_SLOW_QUERY_LOG", str(tmp_path / "env.jsonl"))
+    monkeypatch.setenv("ARTICLES_SLOW_QUERY_EXPLAIN_RATE", "0")
+    log = slowlog.install_from_env()
+    try:
+        assert log in instrumentation._after_hooks
+        assert log.threshold == 0.01
+    finally:
+        log.uninstall()
+    assert log not in instrumentation._after_hooks
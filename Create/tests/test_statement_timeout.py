@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import psycopg2.errors
+import pytest
+from lib.db import query
+from lib.db.breaker import Overloaded
+from lib.db.query import StatementTimeout, _timeout_prefix, statement_timeout
+
+CONN = SimpleNamespace()
+
+
+class FakeCursor:
+    rowcount = -1
+
+    def __init__(self, error=None):
+        self.connection = CONN
+        self.error = error
+        self.sent = []
+
+    def execute(self, sql, params=None):
+        self.sent.append(sql)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def in_transaction():
+    token = query._current.set((CONN, set(), [None]))
+    yield
+    query._current.reset(token)
+
+
+# Tests
+def test_precedence(monkeypatch):
+    monkeypatch.setattr(query, "DEFAULT_STATEMENT_TIMEOUT", 5000)
+    assert _timeout_prefix(CONN, "Magazine.all", None) == ("SET LOCAL statement_timeout = 5000; ", 5000)
+    assert _timeout_prefix(CONN, "Author.find_by_name", None)[1] == 2000
+    with statement_timeout(300):
+        assert _timeout_prefix(CONN, "Author.find_by_name", None)[1] == 300
+        assert _timeout_prefix(CONN, "Author.find_by_name", 50)[1] == 50
+    monkeypatch.setattr(query, "DEFAULT_STATEMENT_TIMEOUT", None)
+    assert _timeout_prefix(CONN, "Magazine.all", None) == ("", None)
+
+
+def test_transaction_sends_only_changes(in_transaction):
+    assert _timeout_prefix(CONN, "Author.find_by_name", None)[0] == "SET LOCAL statement_timeout = 2000; "
+    assert _timeout_prefix(CONN, "Article.find_by_title", None)[0] == ""
+    assert _timeout_prefix(CONN, "Magazine.all", None)[0] == "SET LOCAL statement_timeout = DEFAULT; "
+    assert _timeout_prefix(CONN, "Magazine.all", None)[0] == ""
+
+
+def test_prefix_is_sent_with_the_statement():
+    cursor = FakeCursor()
+    query._execute(cursor, "SELECT * FROM authors WHERE name ILIKE %s", ("%a%",), False, "Author.find_by_name")
+    assert cursor.sent == ["SET LOCAL statement_timeout = 2000; SELECT * FROM authors WHERE name ILIKE %s"]
+
+
+def test_query_canceled_becomes_statement_timeout():
+    cursor = FakeCursor(psycopg2.errors.QueryCanceled("canceling statement due to statement timeout"))
+    with pytest.raises(StatementTimeout) as error:
+        query._execute(cursor, "SELECT * FROM articles WHERE title ILIKE %s", ("%a%",), False,
+                       "Article.find_by_title", timeout=100)
+    assert isinstance(error.value, Overloaded)
+    assert (error.value.method, error.value.timeout) == ("Article.find_by_title", 100)
+    assert isinstance(error.value.__cause__, psycopg2.errors.QueryCanceled)
@@ -0,0 +1,139 @@
+# benchmarks/__main__.py
+# Times every model method at several data scales and writes JSON results.
+#
+#   python -m benchmarks --scales 10k --iterations 200 --output bench.json
+#   DB_NAME=articles_bench python -m benchmarks --seed-db --scales 1k,10k,100k
+#
+# By default the database is assumed to already hold the single scale passed.
+# --seed-db truncates and reloads every scale with lib.db.seed, so it refuses to
+# run against the application database: point DB_NAME at a scratch one.
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.cases import CASES
+from lib.db.connection import APP_DATABASE, DB_CONFIG
+from lib.db.seed import parse_scale, seed, sizes
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure(name, data, iterations, warmup, alloc_iterations, rng):
+    prepare, call = CASES[name]
+    for _ in range(warmup):
+        call(prepare(rng, data))
+    samples = []
+    for _ in range(iterations):
+        args = prepare(rng, data)
+        started = time.perf_counter_ns()
+        call(args)
+        samples.append((time.perf_counter_ns() - started) / 1e6)
+    # Allocation tracing slows everything down, so it gets its own pass
+    allocated = []
+    peaks = []
+    for _ in range(alloc_iterations):
+        args = prepare(rng, data)
+        tracemalloc.start()
+        call(args)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(current)
+        peaks.append(peak)
+    total_seconds = sum(samples) / 1000
+    return {
+        "iterations": iterations,
+        "samples_ms": samples,
+        "mean_ms": sum(samples) / len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "throughput_per_s": iterations / total_seconds if total_seconds else 0.0,
+        "retained_bytes": percentile(allocated, 50),
+        "peak_bytes": percentile(peaks, 50),
+        "peak_bytes_samples": peaks,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--scales", help="comma-separated article counts (default 1k,10k,100k with --seed-db)")
+    parser.add_argument("--methods", default=",".join(CASES), help="comma-separated case names")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-db", action="store_true",
+                        help="truncate and reload the database for each scale (never the app database)")
+    parser.add_argument("--output", default="bench.json")
+    args = parser.parse_args(argv)
+
+    if args.seed_db and DB_CONFIG["dbname"] == APP_DATABASE:
+        parser.error(f"--seed-db truncates every table; set DB_NAME to a scratch database, not {APP_DATABASE}")
+    if args.scales is None:
+        if not args.seed_db:
+            parser.error("pass --scales with the article count already loaded, or --seed-db")
+        args.scales = "1k,10k,100k"
+    scales = [parse_scale(scale) for scale in args.scales.split(",")]
+    methods = [method for method in args.methods.split(",") if method]
+    unknown = [method for method in methods if method not in CASES]
+    if unknown:
+        parser.error(f"unknown methods: {', '.join(unknown)}")
+    if not args.seed_db and len(scales) != 1:
+        parser.error("without --seed-db only the single scale already loaded can be measured")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for scale in scales:
+        if args.seed_db:
+            seed(scale, args.seed, truncate=True, log=lambda message: print(message, file=sys.stderr))
+        authors, magazines = sizes(scale)
+        data = {"articles": scale, "authors": authors, "magazines": magazines}
+        rng = random.Random(args.seed)
+        results = report["results"][str(scale)] = {}
+        for method in methods:
+            results[method] = measure(method, data, args.iterations, args.warmup, args.alloc_iterations, rng)
+            result = results[method]
+            print(
+                f"{scale:>10} {method:<30} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms"
+                f"  p99 {result['p99_ms']:8.3f} ms  {result['throughput_per_s']:9.1f}/s"
+                f"  peak {result['peak_bytes'] / 1024:8.1f} KiB"
+            )
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/cases.py
+# One case per public model method. Each case is a pair of callables:
+# prepare(rng, data) builds the arguments outside the timed region and
+# call(args) runs the model statement through lib.db.query, past its caches so
+# the cached finders are timed against the database rather than a dict lookup.
+import random
+
+from lib.db.query import run, uncached
+from lib.db.seed import CATEGORIES, WORDS, parse_scale, sizes
+
+CONTENT = "Benchmark article body. " * 8
+
+
+def _article_id(rng, data):
+    return (rng.randint(1, data["articles"]),)
+
+
+def _magazine_id(rng, data):
+    return (rng.randint(1, data["magazines"]),)
+
+
+def _author_id(rng, data):
+    return (rng.randint(1, data["authors"]),)
+
+
+def _title_pattern(rng, data):
+    return (f"%{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}%",)
+
+
+def _category(rng, data):
+    return (rng.choice(CATEGORIES),)
+
+
+def _nothing(rng, data):
+    return ()
+
+
+def _update_args(rng, data):
+    # Save the row back with its own title, content, author and magazine so repeated
+    # runs on the same data don't drift away from the seeded distribution
+    article_id = rng.randint(1, data["articles"])
+    rows = run("Article.find_by_id", article_id)
+    if not rows:
+        return ("Benchmark Update", CONTENT, 1, 1, article_id)
+    row = rows[0]
+    return (row["title"], row["content"], row["author_id"], row["magazine_id"], article_id)
+
+
+def _delete_args(rng, data):
+    # The row to delete is created here, outside the timed region
+    rows = run("Article.create", "Benchmark Delete", CONTENT,
+               rng.randint(1, data["authors"]), rng.randint(1, data["magazines"]))
+    return (rows[0]["id"],)
+
+
+def _call(name):
+    def call(args):
+        with uncached():
+            return run(name, *args)
+    return call
+
+
+CASES = {
+    "Article.find_by_id": (_article_id, _call("Article.find_by_id")),
+    "Article.find_by_title": (_title_pattern, _call("Article.find_by_title")),
+    "Magazine.find_by_category": (_category, _call("Magazine.find_by_category")),
+    "Magazine.all": (_nothing, _call("Magazine.all")),
+    "Article.save": (_update_args, _call("Article.update")),
+    "Article.delete": (_delete_args, _call("Article.delete")),
+    "Author.most_prolific": (_nothing, _call("Author.most_prolific")),
+    "Magazine.article_titles": (_magazine_id, _call("Magazine.article_titles")),
+    "Magazine.contributing_authors": (_magazine_id, _call("Magazine.contributing_authors")),
+    "Author.topic_areas": (_author_id, _call("Author.topic_areas")),
+}
+
+# The cases that leave the data as it was
+READ_CASES = tuple(name for name in CASES if name not in ("Article.save", "Article.delete"))
+
+
+def workload(names, scale, iterations, seed=42):
+    """Callable running each named case iterations times against data seeded at scale"""
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise ValueError(f"unknown cases: {', '.join(unknown)}")
+    articles = parse_scale(scale)
+    authors, magazines = sizes(articles)
+    data = {"articles": articles, "authors": authors, "magazines": magazines}
+    rng = random.Random(seed)
+
+    def run_cases():
+        for name in names:
+            prepare, call = CASES[name]
+            for _ in range(iterations):
+                call(prepare(rng, data))
+    return run_cases
@@ -0,0 +1,115 @@
+# benchmarks/compare.py
+# Compares a benchmark run against a stored baseline and fails on regressions.
+#
+#   python -m benchmarks.compare baseline.json bench.json --threshold 0.05
+#
+# For every method and scale present in both files, the ratio of medians
+# (new / baseline) gets a bootstrap confidence interval. It is a regression
+# only when the whole interval lies above 1 + threshold, so noise alone does
+# not fail the gate. Exits 1 on any latency or memory regression, and when a
+# method or scale in the baseline is missing from the new run (or nothing matched).
+import argparse
+import json
+import random
+import statistics
+import sys
+
+METRICS = (("latency", "samples_ms"), ("memory", "peak_bytes_samples"))
+
+
+def bootstrap_ratio(baseline, current, resamples=2000, confidence=0.95, rng=None):
+    """(ratio of medians, low, high) with a percentile bootstrap interval"""
+    rng = rng or random.Random(0)
+    base_median = statistics.median(baseline)
+    ratio = statistics.median(current) / base_median if base_median else float("inf")
+    ratios = []
+    for _ in range(resamples):
+        base = statistics.median(rng.choices(baseline, k=len(baseline)))
+        new = statistics.median(rng.choices(current, k=len(current)))
+        ratios.append(new / base if base else float("inf"))
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (resamples - 1))]
+    high = ratios[int((1 - tail) * (resamples - 1))]
+    return ratio, low, high
+
+
+def compare(baseline, current, threshold=0.05, resamples=2000, confidence=0.95):
+    """Rows of (scale, method, metric, ratio, low, high, verdict)"""
+    rng = random.Random(0)
+    rows = []
+    for scale, methods in current["results"].items():
+        base_methods = baseline["results"].get(scale, {})
+        for method, result in methods.items():
+            base = base_methods.get(method)
+            if base is None:
+                continue
+            for metric, key in METRICS:
+                if not base.get(key) or not result.get(key):
+                    continue
+                ratio, low, high = bootstrap_ratio(base[key], result[key], resamples, confidence, rng)
+                if low > 1 + threshold:
+                    verdict = "REGRESSION"
+                elif high < 1 - threshold:
+                    verdict = "improved"
+                else:
+                    verdict = "ok"
+                rows.append((scale, method, metric, ratio, low, high, verdict))
+    return rows
+
+
+def missing(baseline, current):
+    """(scale, method) pairs in the baseline that the current run did not measure"""
+    return [
+        (scale, method)
+        for scale, methods in baseline["results"].items()
+        for method in methods
+        if method not in current["results"].get(scale, {})
+    ]
+
+
+def print_table(rows, out=sys.stdout):
+    header = f"{'scale':>10}  {'method':<30} {'metric':<8} {'change':>8}  {'interval':>19}  verdict"
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for scale, method, metric, ratio, low, high, verdict in rows:
+        print(
+            f"{scale:>10}  {method:<30} {metric:<8} {(ratio - 1) * 100:+7.1f}%"
+            f"  [{(low - 1) * 100:+7.1f}%, {(high - 1) * 100:+7.1f}%]  {verdict}",
+            file=out,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="relative change tolerated beyond the interval (default 0.05)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--resamples", type=int, default=2000)
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.resamples, args.confidence)
+    print_table(rows)
+    status = 0
+    regressions = [row for row in rows if row[-1] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} significant regression(s)", file=sys.stderr)
+        status = 1
+    absent = missing(baseline, current)
+    for scale, method in absent:
+        print(f"warning: {method} at {scale} is in the baseline but not in {args.current}", file=sys.stderr)
+    if absent:
+        status = 1
+    if not rows:
+        print("no method and scale in common with the baseline", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# debug.py
+# Profiles a workload with a SIGALRM sampling profiler and writes folded stacks
+# (flamegraph.pl / speedscope / inferno input) plus a top-N summary on stderr.
+#
+#   python debug.py main.py                                  # run a script
+#   python debug.py --cases Article.find_by_id,Magazine.contributing_authors --scale 10k --iterations 500
+#   flamegraph.pl --countname=us profile.folded > profile.svg
+#
+# Each sample is weighted by the wall time since the previous one, so a statement
+# blocking in libpq (signals wait until the call returns) is charged in full to
+# the stack that was waiting. Samples taken between the instrumentation before
+# and after hooks count as database wait, the rest as Python CPU; every sample is
+# attributed to the model method running at the time. Only the main thread is sampled.
+import argparse
+import os
+import random
+import runpy
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from lib.db import instrumentation
+
+DB_WAIT = "[db wait]"
+CPU = "[python]"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.methods = defaultdict(Counter)
+        self.samples = 0
+        self._db_method = None
+        self._db_depth = 0
+        self._main = threading.main_thread().ident
+        self._base = None
+        self._last = None
+
+    # instrumentation hooks: only statements on the sampled thread mark it as waiting
+    def _before(self, event):
+        if threading.get_ident() == self._main:
+            self._db_depth += 1
+            self._db_method = event.method
+
+    def _after(self, event):
+        if threading.get_ident() == self._main:
+            self._db_depth -= 1
+
+    def _sample(self, signum, frame):
+        now = time.perf_counter()
+        weight = int((now - self._last) * 1e6)
+        self._last = now
+        frames = []
+        while frame is not None and frame.f_code is not self._base:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if frame is None:
+            return
+        waiting = self._db_depth > 0
+        method = (self._db_method if waiting else instrumentation.current_method()) or "-"
+        kind = DB_WAIT if waiting else CPU
+        frames.reverse()
+        frames.append(kind)
+        self.stacks[";".join(frames)] += weight
+        self.methods[method][kind] += weight
+        self.samples += 1
+
+    def run(self, workload):
+        """Call workload() with sampling on; frames below it are left out of the stacks"""
+        self._base = workload.__code__
+        instrumentation.add_hook(before=self._before, after=self._after)
+        previous = signal.signal(signal.SIGALRM, self._sample)
+        self._last = time.perf_counter()
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        try:
+            workload()
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+            instrumentation.remove_hook(before=self._before, after=self._after)
+
+    def write_folded(self, path):
+        with open(path, "w") as out:
+            for stack, micros in self.stacks.most_common():
+                out.write(f"{stack} {micros}\n")
+
+    def summary(self, top=20, out=sys.stderr):
+        total = sum(self.stacks.values()) or 1
+        db = sum(kinds[DB_WAIT] for kinds in self.methods.values())
+        print(f"{self.samples} samples, {total / 1e6:.3f} s: "
+              f"db wait {100 * db / total:.1f}%, python {100 * (total - db) / total:.1f}%", file=out)
+
+        print(f"\n{'model method':<32} {'total ms':>10} {'db ms':>10} {'python ms':>10} {'%':>6}", file=out)
+        ranked = sorted(self.methods.items(), key=lambda item: -sum(item[1].values()))
+        for method, kinds in ranked[:top]:
+            spent = sum(kinds.values())
+            print(f"{method:<32} {spent / 1e3:10.1f} {kinds[DB_WAIT] / 1e3:10.1f} "
+                  f"{kinds[CPU] / 1e3:10.1f} {100 * spent / total:6.1f}", file=out)
+
+        own = Counter()
+        inclusive = Counter()
+        for stack, micros in self.stacks.items():
+            frames = stack.split(";")[:-1]
+            if frames:
+                own[frames[-1]] += micros
+            for name in set(frames):
+                inclusive[name] += micros
+        print(f"\n{'self ms':>10} {'total ms':>10}  function", file=out)
+        for name, micros in own.most_common(top):
+            print(f"{micros / 1e3:10.1f} {inclusive[name] / 1e3:10.1f}  {name}", file=out)
+
+
+def case_workload(names, scale, iterations, seed):
+    from benchmarks.cases import workload
+
+    try:
+        return workload(names, scale, iterations, seed)
+    except ValueError as error:
+        raise SystemExit(str(error)) from None
+
+
+def script_workload(target, argv):
+    def workload():
+        sys.argv = [target, *argv]
+        if target.endswith(".py"):
+            runpy.run_path(target, run_name="__main__")
+        else:
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+    return workload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python debug.py")
+    parser.add_argument("target", nargs="?", help="script path or module to run (e.g. main.py)")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed to the target")
+    parser.add_argument("--cases", help="comma-separated benchmark cases to run instead of a script")
+    parser.add_argument("--scale", default="10k", help="article count of the loaded data, for --cases")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per case, for --cases")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--interval", type=float, default=5.0, help="sampling interval in ms")
+    parser.add_argument("--output", default="profile.folded")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.cases:
+        workload = case_workload(args.cases.split(","), args.scale, args.iterations, args.seed)
+    elif args.target:
+        workload = script_workload(args.target, args.args)
+    else:
+        parser.error("give a script or module to run, or --cases")
+
+    profiler = SamplingProfiler(interval=args.interval / 1000)
+    try:
+        profiler.run(workload)
+    finally:
+        profiler.write_folded(args.output)
+        profiler.summary(args.top)
+        print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# lib/db/aio.py
+import asyncio
+import weakref
+
+import psycopg2
+import psycopg2.errors
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+from lib.db import instrumentation
+from lib.db.breaker import breaker
+from lib.db.connection import DB_CONFIG
+from lib.db.queries import QUERIES
+from lib.db.query import StatementTimeout, _timeout_prefix
+
+# A connection streams one iter_rows() at a time, so one cursor name will do
+_CURSOR = "aio_rows"
+
+
+async def wait(conn):
+    """Drive conn.poll() from the event loop instead of blocking on the socket"""
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        future = loop.create_future()
+        fd = conn.fileno()
+        if state == extensions.POLL_READ:
+            loop.add_reader(fd, future.set_result, None)
+            remove = loop.remove_reader
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fd, future.set_result, None)
+            remove = loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"bad poll state: {state}")
+        try:
+            await future
+        finally:
+            remove(fd)
+
+
+async def connect(config=None):
+    conn = psycopg2.connect(**(config or DB_CONFIG), async_=1)
+    await wait(conn)
+    return conn
+
+
+async def _send(conn, sql, params=None, method=None, prefix="", hooks=True):
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    async def run():
+        cursor.execute(prefix + sql, params)
+        await wait(conn)
+
+    if hooks:
+        await instrumentation.execute_async(cursor, sql, params, method, run)
+    else:
+        await run()
+    return cursor
+
+
+async def execute(conn, sql, params=None, method=None, timeout=None):
+    """Run one statement and return its cursor; async connections are always autocommit
+
+    statement_timeout, the instrumentation hooks and StatementTimeout work as
+    in lib.db.query.
+    """
+    prefix, timeout = _timeout_prefix(conn, method, timeout)
+    try:
+        return await _send(conn, sql, params, method, prefix)
+    except psycopg2.errors.QueryCanceled as error:
+        raise StatementTimeout(method, timeout) from error
+
+
+class AsyncPool:
+    """Shares a few async connections among many coroutines
+
+    Bound to the event loop that opens it; get_pool() keeps one per loop.
+    """
+
+    def __init__(self, config=None, min_size=1, max_size=10):
+        self.config = config or DB_CONFIG
+        self.min_size = min_size
+        self.max_size = max_size
+        self._idle = []
+        self._size = 0
+        self._available = None
+        self._closed = False
+
+    async def open(self):
+        # Created inside the loop: before 3.10 Condition binds to the loop current at construction
+        self._available = asyncio.Condition()
+        for _ in range(self.min_size):
+            self._idle.append(await connect(self.config))
+            self._size += 1
+        return self
+
+    async def acquire(self):
+        if self._available is None:
+            await self.open()
+        async with self._available:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                await self._available.wait()
+        try:
+            return await connect(self.config)
+        except BaseException:
+            async with self._available:
+                self._size -= 1
+                self._available.notify()
+            raise
+
+    async def release(self, conn, discard=False):
+        async with self._available:
+            if discard or self._closed or conn.closed:
+                if not conn.closed:
+                    conn.close()
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+    def connection(self):
+        return _PooledConnection(self)
+
+    async def close(self):
+        if self._available is None:
+            return
+        async with self._available:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._available.notify_all()
+
+
+class _PooledConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    async def __aenter__(self):
+        self.conn = await self.pool.acquire()
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # A statement interrupted mid-flight leaves the protocol in an unknown state.
+        # GeneratorExit only means an iter_rows() consumer stopped early, between statements.
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        await self.pool.release(self.conn, discard=failed)
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """The running event loop's pool; connections and waiters can't move between loops"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncPool()
+    return pool
+
+
+async def fetch_all(sql, params=None, pool=None, method=None, timeout=None):
+    with breaker.guard():
+        async with (pool or get_pool()).connection() as conn:
+            cursor = await execute(conn, sql, params, method, timeout)
+            return cursor.fetchall()
+
+
+async def fetch_one(sql, params=None, pool=None, method=None, timeout=None):
+    with breaker.guard():
+        async with (pool or get_pool()).connection() as conn:
+            cursor = await execute(conn, sql, params, method, timeout)
+            return cursor.fetchone()
+
+
+async def iter_rows(sql, params=None, pool=None, batch_size=500, method=None, timeout=None):
+    """Stream rows through a server-side cursor, batch_size rows per round trip
+
+    statement_timeout applies to each FETCH. Breaking out of the loop early
+    rolls back (closing the cursor) and returns the connection to the pool.
+    """
+    with breaker.guard():
+        async with (pool or get_pool()).connection() as conn:
+            prefix, timeout = _timeout_prefix(conn, method, timeout)
+            await _send(conn, "BEGIN READ ONLY; " + prefix, hooks=False)
+            try:
+                await _send(conn, f"DECLARE {_CURSOR} NO SCROLL CURSOR FOR {sql}", params, method)
+                while True:
+                    cursor = await _send(conn, f"FETCH {batch_size} FROM {_CURSOR}", None, method)
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            except psycopg2.errors.QueryCanceled as error:
+                raise StatementTimeout(method, timeout) from error
+            finally:
+                if not conn.closed:
+                    await _send(conn, "ROLLBACK", hooks=False)
+
+
+async def query(name, *params, pool=None, timeout=None):
+    """Awaitable form of a model method, e.g. await query("Article.find_by_title", "%ai%")"""
+    return await fetch_all(QUERIES[name], params or None, pool, name, timeout)
+
+
+async def query_one(name, *params, pool=None, timeout=None):
+    return await fetch_one(QUERIES[name], params or None, pool, name, timeout)
+
+
+def iter_query(name, *params, pool=None, batch_size=500, timeout=None):
+    """async for row in iter_query("Article.all")"""
+    return iter_rows(QUERIES[name], params or None, pool, batch_size, name, timeout)
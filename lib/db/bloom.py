@@ -0,0 +1,138 @@
+# lib/db/bloom.py
+import hashlib
+import math
+import os
+import threading
+import time
+
+from lib.db.connection import get_connection
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; might_contain() is False only for values never added"""
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        positions = self._positions(value)
+        if all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+            # Already (probably) present; counting it again would size the next rebuild too early
+            return
+        for pos in positions:
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    __contains__ = might_contain
+
+
+class EmailBloom:
+    """Bloom filter over authors.email, rebuilt from a full scan at most max_age seconds old
+
+    A full scan sees every committed email, whatever order the ids committed in
+    and including emails changed by Author.update, so may_exist() is exact up to
+    the last rebuild. Emails written through add() count at once; other
+    processes' writes reach lib.db.notify, whose invalidate() makes may_exist()
+    answer True until the next rebuild. The UNIQUE constraint on authors.email
+    stays the final check.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01, max_age=60.0, connection_factory=get_connection,
+                 clock=time.monotonic):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_age = max_age
+        self.connection_factory = connection_factory
+        self.clock = clock
+        self.filter = BloomFilter(capacity, error_rate)
+        self.loaded_at = None
+        self.stale = False
+        self._pending = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the filter from every author's email; returns how many were loaded"""
+        with self._lock:
+            # Emails add()ed while the scan runs are replayed into the new filter;
+            # an invalidate() during the scan leaves it stale again
+            self._pending = []
+            self.stale = False
+        try:
+            conn = self.connection_factory()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT email FROM authors")
+                    rows = cursor.fetchall()
+                conn.commit()
+            finally:
+                conn.close()
+            # Past capacity the false-positive rate climbs, so keep room to double
+            while len(rows) * 2 > self.capacity:
+                self.capacity *= 2
+            rebuilt = BloomFilter(self.capacity, self.error_rate)
+            for row in rows:
+                rebuilt.add(row["email"].lower())
+            with self._lock:
+                for email in self._pending:
+                    rebuilt.add(email)
+                self.filter = rebuilt
+                self.loaded_at = self.clock()
+        finally:
+            with self._lock:
+                self._pending = None
+        return len(rows)
+
+    def _maybe_refresh(self):
+        if self.loaded_at is None:
+            with self._refresh_lock:
+                if self.loaded_at is None:
+                    self.refresh()
+        elif self.clock() - self.loaded_at > self.max_age and self._refresh_lock.acquire(blocking=False):
+            # One thread rebuilds; the others keep answering from the current filter
+            try:
+                self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+    def add(self, email):
+        """Record an email just written by Author.save() or Author.update()"""
+        email = email.lower()
+        with self._lock:
+            self.filter.add(email)
+            if self._pending is not None:
+                self._pending.append(email)
+
+    def invalidate(self):
+        """Another process wrote an author; its email is unknown until the next rebuild"""
+        self.stale = True
+
+    def may_exist(self, email):
+        """False means the email is certainly free and the uniqueness query can be skipped"""
+        self._maybe_refresh()
+        return self.stale or self.filter.might_contain(email.lower())
+
+
+email_bloom = EmailBloom()
+
+
+def _after_fork():
+    email_bloom._lock = threading.Lock()
+    email_bloom._refresh_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
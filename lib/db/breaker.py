@@ -0,0 +1,137 @@
+# lib/db/breaker.py
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+
+from lib.db.metrics import registry
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class Overloaded(Exception):
+    """The database can't take this request right now; shed it (HTTP 503) instead of waiting"""
+
+    retry_after = None
+
+
+class CircuitOpen(Overloaded):
+    def __init__(self, name, retry_after):
+        super().__init__(f"circuit {name} is open, retry in {retry_after:.1f} s")
+        self.retry_after = retry_after
+
+
+# Connection errors (QueryCanceled included), pool timeouts and statement timeouts
+FAILURES = (psycopg2.OperationalError, Overloaded)
+
+
+class CircuitBreaker:
+    """Fails fast once failures reach failure_rate of the calls in the last window seconds
+
+    Needs min_calls in the window before it can trip. After open_for seconds one
+    probe call is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name="postgres", failure_rate=0.5, min_calls=20, window=10.0, open_for=5.0,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.clock = clock
+        self.state = CLOSED
+        self.rejected = 0
+        self._buckets = deque()  # [second, calls, failures]
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _trip(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._buckets.clear()
+
+    def _admit(self):
+        """True when the call is the half-open probe; raises CircuitOpen when rejected"""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            now = self.clock()
+            if self.state == OPEN and now - self._opened_at < self.open_for:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.open_for - (now - self._opened_at))
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.open_for)
+            self.state = HALF_OPEN
+            self._probing = True
+            return True
+
+    def _record(self, failed, probe):
+        with self._lock:
+            now = self.clock()
+            if probe:
+                self._probing = False
+                if failed:
+                    self._trip(now)
+                else:
+                    self.state = CLOSED
+                return
+            if self.state != CLOSED:
+                # Finished after the circuit opened; the probe decides from here
+                return
+            second = int(now)
+            if self._buckets and self._buckets[-1][0] == second:
+                bucket = self._buckets[-1]
+            else:
+                bucket = [second, 0, 0]
+                self._buckets.append(bucket)
+            bucket[1] += 1
+            bucket[2] += failed
+            while self._buckets[0][0] <= now - self.window:
+                self._buckets.popleft()
+            calls = sum(b[1] for b in self._buckets)
+            failures = sum(b[2] for b in self._buckets)
+            if calls >= self.min_calls and failures >= self.failure_rate * calls:
+                self._trip(now)
+
+    @contextmanager
+    def guard(self):
+        """Run the block through the breaker; only FAILURES count against it"""
+        probe = self._admit()
+        try:
+            yield
+        except BaseException as error:
+            self._record(isinstance(error, FAILURES), probe)
+            raise
+        else:
+            self._record(False, probe)
+
+
+breaker = CircuitBreaker(
+    failure_rate=float(os.getenv("ARTICLES_BREAKER_FAILURE_RATE", "0.5")),
+    min_calls=int(os.getenv("ARTICLES_BREAKER_MIN_CALLS", "20")),
+    open_for=float(os.getenv("ARTICLES_BREAKER_OPEN_SECONDS", "5")),
+)
+
+
+def _after_fork():
+    breaker._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+registry.function(
+    "articles_circuit_open", "1 while the circuit rejects calls, 0.5 while probing",
+    lambda: {(breaker.name,): {CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1}[breaker.state]},
+    ("circuit",),
+)
+registry.function(
+    "articles_circuit_rejected_total", "Calls failed fast by the open circuit",
+    lambda: {(breaker.name,): breaker.rejected},
+    ("circuit",), kind="counter",
+)
@@ -0,0 +1,93 @@
+# lib/db/cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Stored for ids the database reported as absent; distinct from a cache miss (None)
+MISSING = object()
+
+
+class ModelCache:
+    """Per-process cache of find_by_id rows keyed by (table, id)"""
+
+    def __init__(self, max_entries=10000, negative_ttl=30.0):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._missing = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, table, row_id):
+        """Return the cached row, MISSING for a known-absent id, or None"""
+        key = (table, row_id)
+        with self._lock:
+            row = self._entries.get(key)
+            if row is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return row
+            expires = self._missing.get(key)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self.negative_hits += 1
+                    return MISSING
+                del self._missing[key]
+            self.misses += 1
+            return None
+
+    def set(self, table, row_id, row):
+        key = (table, row_id)
+        with self._lock:
+            self._missing.pop(key, None)
+            self._entries[key] = row
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_missing(self, table, row_id):
+        """Remember that a finder came back empty for this id"""
+        if self.negative_ttl <= 0:
+            return
+        key = (table, row_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._missing) >= self.max_entries:
+                now = time.monotonic()
+                self._missing = {k: t for k, t in self._missing.items() if t > now}
+                if len(self._missing) >= self.max_entries:
+                    return
+            self._missing[key] = time.monotonic() + self.negative_ttl
+
+    def evict(self, table, row_id=None):
+        """Drop one row, or every row of a table when row_id is None"""
+        with self._lock:
+            if row_id is not None:
+                self._entries.pop((table, row_id), None)
+                self._missing.pop((table, row_id), None)
+                return
+            for key in [k for k in self._entries if k[0] == table]:
+                del self._entries[key]
+            for key in [k for k in self._missing if k[0] == table]:
+                del self._missing[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._missing.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+model_cache = ModelCache()
+
+
+def _after_fork():
+    model_cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -1,14 +1,44 @@
 # lib/db/connection.py
+import os
+
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+# The application's own database; tools that truncate tables refuse to touch it
+APP_DATABASE = "articles_challenge"
+
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME", APP_DATABASE),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "postgres"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", "5432"),
+}
+
+
+def _server_configs(spec):
+    """Parse "host:port[/dbname],..."; every other setting is shared with the primary"""
+    servers = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        address, _, dbname = entry.partition("/")
+        host, _, port = address.partition(":")
+        servers.append(dict(
+            DB_CONFIG,
+            host=host or DB_CONFIG["host"],
+            port=port or DB_CONFIG["port"],
+            dbname=dbname or DB_CONFIG["dbname"],
+        ))
+    return servers
+
+
+REPLICAS = _server_configs(os.getenv("DB_REPLICAS", ""))
+REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")
+
+# Databases holding the articles table when sharding by magazine_id is enabled
+SHARDS = _server_configs(os.getenv("DB_SHARDS", ""))
+
+
 def get_connection():
-    conn = psycopg2.connect(
-        dbname="articles_challenge",
-        user="postgres",     
-        password="postgres",  
-        host="localhost",
-        port="5432"
-    )
-    conn.cursor_factory = RealDictCursor  
-    return conn
\ No newline at end of file
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.cursor_factory = RealDictCursor
+    return conn
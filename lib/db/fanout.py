@@ -0,0 +1,94 @@
+# lib/db/fanout.py
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from lib.db import query
+from lib.db.breaker import breaker
+from lib.db.queries import QUERIES
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fanout")
+    return _executor
+
+
+def _after_fork():
+    # Worker threads don't survive fork(); the child builds its own executor
+    global _executor
+    _executor = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class FanOutResult(dict):
+    """Results by name, also readable as attributes; timings holds each query's seconds"""
+
+    def __init__(self, results, timings, elapsed):
+        super().__init__(results)
+        self.timings = timings
+        self.elapsed = elapsed
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+@contextmanager
+def _guarded(pool):
+    with breaker.guard():
+        with pool.connection() as conn:
+            yield conn
+
+
+def _run(connect, sql, params, single):
+    started = time.perf_counter()
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            # Same statement_timeout and QueryCanceled handling as lib.db.query
+            query._execute(cursor, sql, params, False, None)
+            rows = cursor.fetchone() if single else cursor.fetchall()
+    return rows, time.perf_counter() - started
+
+
+def fan_out(queries, pool=None):
+    """Run independent reads concurrently, each on its own pooled connection
+
+    queries maps a result name to (sql, params) or (sql, params, single).
+    Latency is that of the slowest query rather than the sum.
+    """
+    connect = partial(_guarded, pool) if pool else query.read_connection
+    started = time.perf_counter()
+    futures = {}
+    for name, spec in queries.items():
+        sql, params, single = (tuple(spec) + (False,))[:3]
+        # Carry the caller's context so read-your-writes routing still applies
+        context = contextvars.copy_context()
+        futures[name] = _get_executor().submit(context.run, _run, connect, sql, params, single)
+    results, timings = {}, {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    return FanOutResult(results, timings, time.perf_counter() - started)
+
+
+def magazine_dashboard(magazine_id, pool=None):
+    """Everything the magazine page shows, fetched in parallel"""
+    params = (magazine_id,)
+    return fan_out({
+        "magazine": (QUERIES["Magazine.find_by_id"], params, True),
+        "article_titles": (QUERIES["Magazine.article_titles"], params),
+        "article_count": (QUERIES["Magazine.article_count"], params, True),
+        "contributors": (QUERIES["Magazine.contributors"], params),
+        "contributing_authors": (QUERIES["Magazine.contributing_authors"], params),
+        "top_publisher": (QUERIES["Magazine.top_publisher"], None, True),
+    }, pool)
@@ -0,0 +1,226 @@
+# lib/db/index_advisor.py
+# Suggests missing and unused indexes for the statements the models issue.
+#
+#   python -m lib.db.index_advisor --cases --scale 10k    # record the benchmark read cases
+#   python -m lib.db.index_advisor --run workload.py      # record a script that calls lib.db.query
+#   python -m lib.db.index_advisor --source catalog       # every statement in lib/db/queries.py
+#
+# Plans come from EXPLAIN (GENERIC_PLAN), so PostgreSQL 16+ is required. Candidate
+# indexes are costed with hypopg when it is installed, otherwise by building them
+# inside a transaction that is rolled back - only do that against a local database.
+import argparse
+import re
+import runpy
+import sys
+
+import psycopg2
+
+from lib.db.connection import get_connection
+from lib.db.prepared import to_server_params
+from lib.db.queries import QUERIES
+
+MODEL_TABLES = ("authors", "magazines", "articles", "author_magazine")
+
+# Filters look like "(magazine_id = $1)", "((category)::text = $1)" or "lower((email)::text) = ..."
+_LOWER_RE = re.compile(r"lower\(\(?(\w+)\)?(?:::\w+)?\)\s*=")
+_COLUMN_RE = re.compile(r"(?<![:\w])\(?(\w+)\)?(?:::\w+)?\s*(=|<|>|<=|>=|IS)\s")
+_LIKE_RE = re.compile(r"(?<![:\w])\(?(\w+)\)?(?:::\w+)?\s*~~\*?\s")
+# lib.db.query sends catalog statements as PREPARE model_stmt_N AS <statement>
+_PREPARE_RE = re.compile(r"^\s*PREPARE\s+\w+\s*(?:\([^)]*\))?\s+AS\s+", re.IGNORECASE)
+
+
+def capture_statements(conn, min_calls=1):
+    """Normalized statements touching the model tables, busiest first
+
+    The PREPARE prefix of prepared model statements is stripped, and the same
+    statement prepared on several connections is counted once.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT query, calls, total_exec_time FROM pg_stat_statements
+            WHERE calls >= %s AND dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            ORDER BY total_exec_time DESC
+        """, (min_calls,))
+        rows = cursor.fetchall()
+    pattern = re.compile(r"\b(" + "|".join(MODEL_TABLES) + r")\b", re.IGNORECASE)
+    statements = {}
+    for row in rows:
+        query = _PREPARE_RE.sub("", row["query"], count=1).strip()
+        if not pattern.search(query) or not query.upper().startswith("SELECT"):
+            continue
+        calls, total = statements.get(query, (0, 0.0))
+        statements[query] = (calls + row["calls"], total + row["total_exec_time"])
+    return sorted(
+        ((query, calls, total) for query, (calls, total) in statements.items()),
+        key=lambda statement: statement[2], reverse=True,
+    )
+
+
+def catalog_statements():
+    return [(to_server_params(sql)[0], 0, 0.0) for sql in QUERIES.values() if sql.startswith("SELECT")]
+
+
+def explain(conn, sql):
+    with conn.cursor() as cursor:
+        # No params, so psycopg2 sends the text as is: a literal % must stay single
+        cursor.execute("EXPLAIN (GENERIC_PLAN, FORMAT JSON) " + sql)
+        return cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def candidates(plan):
+    """(table, columns, method) for every sequential scan that filters or feeds a sort"""
+    found = []
+    seen = set()
+    for node in _nodes(plan):
+        children = node.get("Plans", [])
+        sort_keys = []
+        if node["Node Type"] == "Sort" and len(children) == 1:
+            sort_keys = [key.split()[0].split(".")[-1] for key in node.get("Sort Key", [])]
+            node = children[0]
+        if node["Node Type"] != "Seq Scan" or id(node) in seen:
+            continue
+        seen.add(id(node))
+        table = node["Relation Name"]
+        condition = node.get("Filter", "")
+        likes = _LIKE_RE.findall(condition)
+        if likes:
+            found.append((table, tuple(dict.fromkeys(likes)), "gin_trgm"))
+            continue
+        columns = [f"lower({column})" for column in _LOWER_RE.findall(condition)]
+        columns += [column for column, _ in _COLUMN_RE.findall(condition) if column != "lower"]
+        columns += [key for key in sort_keys if key not in columns]
+        if columns:
+            found.append((table, tuple(dict.fromkeys(columns)), "btree"))
+    return found
+
+
+def index_ddl(table, columns, method):
+    if method == "gin_trgm":
+        return f"CREATE INDEX ON {table} USING gin ({', '.join(c + ' gin_trgm_ops' for c in columns)})"
+    return f"CREATE INDEX ON {table} ({', '.join(columns)})"
+
+
+def _has_hypopg(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+        return cursor.fetchone() is not None
+
+
+def cost_with_index(conn, sql, ddl, hypothetical):
+    """Estimated total cost of sql once ddl exists, without keeping the index"""
+    with conn.cursor() as cursor:
+        if hypothetical:
+            cursor.execute("SELECT * FROM hypopg_create_index(%s)", (ddl,))
+            try:
+                return explain(conn, sql)["Total Cost"]
+            finally:
+                cursor.execute("SELECT hypopg_reset()")
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(ddl)
+            return explain(conn, sql)["Total Cost"]
+        finally:
+            cursor.execute("ROLLBACK")
+
+
+def unused_indexes(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT s.relname AS table_name, s.indexrelname AS index_name, s.idx_scan,
+                   pg_relation_size(s.indexrelid) AS bytes
+            FROM pg_stat_user_indexes s JOIN pg_index i ON i.indexrelid = s.indexrelid
+            WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+              AND s.relname = ANY(%s)
+            ORDER BY bytes DESC
+        """, (list(MODEL_TABLES),))
+        return cursor.fetchall()
+
+
+def advise(conn, statements):
+    """[(sql, calls, ddl, cost_before, cost_after)] for candidates that lower the cost"""
+    conn.autocommit = True
+    hypothetical = _has_hypopg(conn)
+    suggestions = []
+    for sql, calls, _ in statements:
+        try:
+            plan = explain(conn, sql)
+        except psycopg2.Error as error:
+            print(f"skipping ({error.pgerror or error}): {sql}", file=sys.stderr)
+            continue
+        for table, columns, method in candidates(plan):
+            ddl = index_ddl(table, columns, method)
+            try:
+                after = cost_with_index(conn, sql, ddl, hypothetical)
+            except psycopg2.Error as error:
+                print(f"cannot cost {ddl} ({error.pgerror or error})", file=sys.stderr)
+                continue
+            if after < plan["Total Cost"]:
+                suggestions.append((sql, calls, ddl, plan["Total Cost"], after))
+    return suggestions
+
+
+def report(suggestions, unused, out=sys.stdout):
+    print("Missing indexes", file=out)
+    if not suggestions:
+        print("  none", file=out)
+    for sql, calls, ddl, before, after in sorted(suggestions, key=lambda s: s[4] - s[3]):
+        print(f"  {ddl};", file=out)
+        print(f"    cost {before:.1f} -> {after:.1f} ({after - before:+.1f}), calls {calls}", file=out)
+        print(f"    for: {' '.join(sql.split())}", file=out)
+    print("Unused indexes", file=out)
+    if not unused:
+        print("  none", file=out)
+    for row in unused:
+        print(f"  {row['index_name']} on {row['table_name']} ({row['bytes']} bytes, 0 scans)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lib.db.index_advisor")
+    parser.add_argument("--source", choices=("statements", "catalog"), default="statements",
+                        help="pg_stat_statements (default) or the model query catalog")
+    workloads = parser.add_mutually_exclusive_group()
+    workloads.add_argument("--cases", nargs="?", const="", metavar="NAMES",
+                          help="reset pg_stat_statements and run these benchmark cases first "
+                               "(default: every read case)")
+    workloads.add_argument("--run", metavar="SCRIPT",
+                          help="reset pg_stat_statements, run this workload script, then advise")
+    parser.add_argument("--scale", default="10k", help="article count of the loaded data, for --cases")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per case, for --cases")
+    parser.add_argument("--min-calls", type=int, default=1)
+    args = parser.parse_args(argv)
+    run_workload = None
+    if args.cases is not None:
+        from benchmarks.cases import READ_CASES, workload
+
+        names = args.cases.split(",") if args.cases else READ_CASES
+        try:
+            run_workload = workload(names, args.scale, args.iterations)
+        except ValueError as error:
+            parser.error(str(error))
+    elif args.run:
+        def run_workload():
+            runpy.run_path(args.run, run_name="__main__")
+    conn = get_connection()
+    conn.autocommit = True
+    try:
+        if run_workload is not None:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_stat_statements_reset()")
+            run_workload()
+        if args.source == "catalog":
+            statements = catalog_statements()
+        else:
+            statements = capture_statements(conn, args.min_calls)
+        report(advise(conn, statements), unused_indexes(conn))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
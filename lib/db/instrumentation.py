@@ -0,0 +1,236 @@
+# lib/db/instrumentation.py
+import contextvars
+import math
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_before_hooks = []
+_after_hooks = []
+
+# "Model.method" whose statements are running in this thread or task
+_current_method = contextvars.ContextVar("current_method", default=None)
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def shape(sql):
+    """Statement with literals replaced by ? and whitespace collapsed"""
+    return _SPACE_RE.sub(" ", _LITERAL_RE.sub("?", sql)).strip()
+
+
+class QueryEvent:
+    __slots__ = ("sql", "shape", "params", "method", "rowcount", "duration", "error")
+
+    def __init__(self, sql, params, method):
+        self.sql = sql
+        self.shape = shape(sql)
+        self.params = params
+        self.method = method
+        self.rowcount = None
+        self.duration = None
+        self.error = None
+
+
+def add_hook(before=None, after=None):
+    """before(event) runs ahead of the statement, after(event) once rowcount/duration/error are set"""
+    if before is not None:
+        _before_hooks.append(before)
+    if after is not None:
+        _after_hooks.append(after)
+
+
+def remove_hook(before=None, after=None):
+    if before in _before_hooks:
+        _before_hooks.remove(before)
+    if after in _after_hooks:
+        _after_hooks.remove(after)
+
+
+def current_method():
+    return _current_method.get()
+
+
+@contextmanager
+def model_method(name):
+    """Attribute every statement issued inside the block to a model method"""
+    token = _current_method.set(name)
+    try:
+        yield
+    finally:
+        _current_method.reset(token)
+
+
+def execute(cursor, sql, params=None, method=None, runner=None):
+    """cursor.execute (or runner()) wrapped in the registered hooks"""
+    run = runner or (lambda: cursor.execute(sql, params))
+    if not _before_hooks and not _after_hooks:
+        return run()
+    event = QueryEvent(sql, params, method or _current_method.get())
+    for hook in _before_hooks:
+        hook(event)
+    started = time.perf_counter()
+    try:
+        return run()
+    except BaseException as error:
+        event.error = error
+        raise
+    finally:
+        event.duration = time.perf_counter() - started
+        event.rowcount = cursor.rowcount
+        for hook in _after_hooks:
+            hook(event)
+
+
+async def execute_async(cursor, sql, params, method, runner):
+    """execute() for lib.db.aio: awaits runner() between the same hooks"""
+    if not _before_hooks and not _after_hooks:
+        return await runner()
+    event = QueryEvent(sql, params, method or _current_method.get())
+    for hook in _before_hooks:
+        hook(event)
+    started = time.perf_counter()
+    try:
+        return await runner()
+    except BaseException as error:
+        event.error = error
+        raise
+    finally:
+        event.duration = time.perf_counter() - started
+        event.rowcount = cursor.rowcount
+        for hook in _after_hooks:
+            hook(event)
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of microseconds: 2**SUB_BITS linear buckets per power of two"""
+
+    SUB_BITS = 5
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, micros):
+        if micros < 1 << self.SUB_BITS:
+            return int(micros)
+        exponent = int(micros).bit_length() - self.SUB_BITS - 1
+        return (exponent + 1 << self.SUB_BITS) + (int(micros) >> exponent) - (1 << self.SUB_BITS)
+
+    def _bucket_value(self, bucket):
+        """Upper edge of a bucket, in microseconds"""
+        if bucket < 1 << self.SUB_BITS:
+            return bucket + 1
+        exponent = (bucket >> self.SUB_BITS) - 1
+        mantissa = (bucket & ((1 << self.SUB_BITS) - 1)) + (1 << self.SUB_BITS)
+        return (mantissa + 1) << exponent
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        bucket = self._bucket(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct):
+        """Seconds at or below which pct percent of the recorded values fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class HistogramCollector:
+    """after-hook keeping a latency histogram per statement shape"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.methods = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            histogram = self.histograms.get(event.shape)
+            if histogram is None:
+                histogram = self.histograms[event.shape] = LatencyHistogram()
+            histogram.record(event.duration)
+            if event.method:
+                self.methods.setdefault(event.shape, set()).add(event.method)
+            if event.error is not None:
+                self.errors[event.shape] = self.errors.get(event.shape, 0) + 1
+
+    def install(self):
+        add_hook(after=self)
+        return self
+
+    def uninstall(self):
+        remove_hook(after=self)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.methods.clear()
+            self.errors.clear()
+
+    def dump(self):
+        """{shape: summary} with the calling methods and error count, slowest p99 first"""
+        with self._lock:
+            report = {
+                statement: dict(
+                    histogram.summary(),
+                    methods=sorted(self.methods.get(statement, ())),
+                    errors=self.errors.get(statement, 0),
+                )
+                for statement, histogram in self.histograms.items()
+            }
+        return dict(sorted(report.items(), key=lambda item: item[1]["p99"], reverse=True))
+
+    def dump_text(self, out=sys.stderr):
+        for statement, summary in self.dump().items():
+            print(
+                f"{summary['count']:>8}  p50 {summary['p50'] * 1e3:8.3f} ms  p99 {summary['p99'] * 1e3:8.3f} ms"
+                f"  max {summary['max'] * 1e3:8.3f} ms  {','.join(summary['methods']) or '-'}  {statement}",
+                file=out,
+            )
+
+    def dump_on_signal(self, signum=signal.SIGUSR1):
+        """kill -USR1 <pid> prints the histograms to stderr"""
+        signal.signal(signum, lambda *_: self.dump_text())
+
+
+collector = HistogramCollector()
+
+
+def _after_fork():
+    collector._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
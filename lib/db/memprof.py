@@ -0,0 +1,112 @@
+# lib/db/memprof.py
+import atexit
+import os
+import sys
+import tracemalloc
+from collections import Counter, defaultdict
+
+# ARTICLES_MEMPROF=1 snapshots allocations around every lib.db.query.run() call and
+# prints the worst offenders at exit (or to ARTICLES_MEMPROF_OUTPUT). Off, run()
+# only checks ENABLED.
+ENABLED = os.getenv("ARTICLES_MEMPROF", "") not in ("", "0")
+FRAMES = int(os.getenv("ARTICLES_MEMPROF_FRAMES", "1"))
+# tracemalloc.reset_peak() is new in Python 3.9
+_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class MethodMemory:
+    def __init__(self):
+        self.calls = 0
+        self.peak = 0
+        self.peak_total = 0
+        self.retained = 0
+        self.retained_total = 0
+        self.lines = Counter()
+
+    def record(self, peak, retained, lines):
+        self.calls += 1
+        self.peak = max(self.peak, peak)
+        self.peak_total += peak
+        self.retained = max(self.retained, retained)
+        self.retained_total += retained
+        self.lines.update(lines)
+
+
+class MemoryProfile:
+    """Peak and retained bytes per model method, retained bytes per allocating source line
+
+    Peak is the high-water mark above the starting level during the call, so it
+    includes rows that were fetched and dropped. Retained is what was still alive
+    when the call returned, including the result itself. tracemalloc is process
+    wide, so concurrent calls in other threads show up in each other's numbers.
+
+    On Python 3.8 the peak cannot be reset, so a call that stays under the
+    process's earlier high-water mark reports its retained bytes as its peak.
+    """
+
+    def __init__(self):
+        self.methods = defaultdict(MethodMemory)
+
+    def call(self, name, fn, *args):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+        before = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        start, start_peak = tracemalloc.get_traced_memory()
+        if _RESET_PEAK:
+            tracemalloc.reset_peak()
+        try:
+            return fn(*args)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if not _RESET_PEAK and peak == start_peak:
+                peak = current
+            after = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+            lines = {
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}": stat.size_diff
+                for stat in after.compare_to(before, "lineno")
+                if stat.size_diff > 0
+            }
+            self.methods[name].record(max(peak - start, 0), max(current - start, 0), lines)
+
+    def reset(self):
+        self.methods.clear()
+
+    def report(self, top=10, out=sys.stderr):
+        ranked = sorted(self.methods.items(), key=lambda item: -item[1].peak)[:top]
+        print(f"{'model method':<32} {'calls':>7} {'max peak':>12} {'avg peak':>12} "
+              f"{'max retained':>13} {'avg retained':>13}", file=out)
+        for name, stats in ranked:
+            print(f"{name:<32} {stats.calls:>7} {_size(stats.peak):>12} "
+                  f"{_size(stats.peak_total / stats.calls):>12} {_size(stats.retained):>13} "
+                  f"{_size(stats.retained_total / stats.calls):>13}", file=out)
+            for line, size in stats.lines.most_common(3):
+                print(f"    {_size(size):>10}  {line}", file=out)
+
+
+def _size(count):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(count) < 1024:
+            return f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GiB"
+
+
+profile = MemoryProfile()
+
+
+def _report_at_exit():
+    path = os.getenv("ARTICLES_MEMPROF_OUTPUT")
+    if path:
+        with open(path, "w") as out:
+            profile.report(out=out)
+    else:
+        profile.report()
+
+
+if ENABLED:
+    atexit.register(_report_at_exit)
@@ -0,0 +1,276 @@
+# lib/db/metrics.py
+import math
+import os
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class FunctionMetric(_Metric):
+    """Counter or gauge whose samples come from a callback at scrape time
+
+    The callback returns {label values tuple: value}, or a bare number when
+    there are no labels.
+    """
+
+    def __init__(self, name, documentation, function, labelnames=(), kind="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self.kind = kind
+
+    def render(self):
+        samples = self.function()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(samples.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = (("le", _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def function(self, name, documentation, function, labelnames=(), kind="gauge"):
+        return self.register(FunctionMetric(name, documentation, function, labelnames, kind))
+
+    def render(self):
+        """Everything in Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _after_fork():
+    # A lock held by another thread at fork() would stay locked forever in the child
+    global _install_lock
+    _install_lock = threading.Lock()
+    registry._lock = threading.Lock()
+    for metric in list(registry._metrics.values()):
+        metric._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def serve(port=9100, addr="127.0.0.1", registry=registry):
+    """Serve GET /metrics from a daemon thread; returns the server (server_address has the real port)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Registries already fed by install(); installing twice would record every statement twice
+_installed = weakref.WeakSet()
+_install_lock = threading.Lock()
+
+
+def install(registry=registry):
+    """Feed the query layer and cache statistics into the registry"""
+    with _install_lock:
+        if registry in _installed:
+            return registry
+        _installed.add(registry)
+    from lib.db import instrumentation
+    from lib.db.cache import model_cache
+    from lib.db.query_cache import query_cache
+
+    durations = registry.histogram(
+        "articles_query_duration_seconds", "Model statement latency", ("method",)
+    )
+    errors = registry.counter("articles_query_errors_total", "Model statements that raised", ("method",))
+
+    def record(event):
+        method = event.method or "unknown"
+        durations.observe(event.duration, method=method)
+        if event.error is not None:
+            errors.inc(method=method)
+
+    instrumentation.add_hook(after=record)
+
+    registry.function(
+        "articles_cache_hits_total", "Cache lookups answered from memory",
+        lambda: {("model",): model_cache.hits + model_cache.negative_hits, ("query",): query_cache.hits},
+        ("cache",), kind="counter",
+    )
+    registry.function(
+        "articles_cache_misses_total", "Cache lookups that went to the database",
+        lambda: {("model",): model_cache.misses, ("query",): query_cache.misses},
+        ("cache",), kind="counter",
+    )
+    registry.function(
+        "articles_cache_entries", "Entries currently cached",
+        lambda: {("model",): len(model_cache), ("query",): len(query_cache._entries)},
+        ("cache",),
+    )
+    registry.function("articles_query_cache_bytes", "Approximate size of the query result cache",
+                      lambda: query_cache.bytes)
+    return registry
+
+
+def install_from_env():
+    """ARTICLES_METRICS=1 feeds the default registry; ARTICLES_METRICS_PORT also serves
+    it on ARTICLES_METRICS_ADDR (default 127.0.0.1). Returns the server, if any."""
+    port = os.getenv("ARTICLES_METRICS_PORT")
+    if not port and os.getenv("ARTICLES_METRICS", "") in ("", "0"):
+        return None
+    install()
+    if not port:
+        return None
+    return serve(int(port), os.getenv("ARTICLES_METRICS_ADDR", "127.0.0.1"))
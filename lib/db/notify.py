@@ -0,0 +1,129 @@
+# lib/db/notify.py
+import json
+import os
+import select
+import threading
+
+import psycopg2
+
+from lib.db.bloom import email_bloom
+from lib.db.cache import model_cache
+from lib.db.connection import get_connection
+from lib.db.query_cache import query_cache
+
+CHANNEL = "model_changes"
+
+
+class CacheInvalidator(threading.Thread):
+    """Background thread that evicts cached rows on NOTIFY from the triggers in schema.sql"""
+
+    def __init__(self, cache=model_cache, channel=CHANNEL, poll_interval=1.0, results=query_cache,
+                 emails=email_bloom):
+        super().__init__(name="cache-invalidator", daemon=True)
+        self.cache = cache
+        self.results = results
+        self.emails = emails
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        # Set while LISTEN is active; cached reads are only trusted then
+        self.connected = threading.Event()
+        self.conn = None
+
+    def _listen(self):
+        conn = get_connection()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel};")
+        return conn
+
+    def handle(self, payload):
+        try:
+            change = json.loads(payload)
+            self.cache.evict(change["table"], change["id"])
+            self.results.bump(change["table"])
+            if change["table"] == "authors" and change.get("op") != "DELETE":
+                self.emails.invalidate()
+        except (ValueError, KeyError, TypeError):
+            # Unknown payload shape: dropping everything is the only safe option
+            self.cache.clear()
+            self.results.clear()
+            self.emails.invalidate()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.conn = self._listen()
+                # Anything cached before LISTEN took effect may already be stale
+                self.cache.clear()
+                self.results.clear()
+                self.emails.invalidate()
+                self.connected.set()
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([self.conn], [], [], self.poll_interval)
+                    if not readable:
+                        continue
+                    self.conn.poll()
+                    while self.conn.notifies:
+                        self.handle(self.conn.notifies.pop(0).payload)
+            except psycopg2.Error:
+                # Notifications are lost while disconnected
+                self.connected.clear()
+                self.cache.clear()
+                self.results.clear()
+                self._stop_event.wait(self.poll_interval)
+            finally:
+                self.connected.clear()
+                if self.conn is not None and not self.conn.closed:
+                    self.conn.close()
+                self.conn = None
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _after_fork():
+    # The listener thread doesn't survive fork(); start_listener() starts a new one
+    global _listener, _listener_lock
+    _listener = None
+    _listener_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def start_listener(cache=model_cache):
+    """Start this process's invalidation thread if it is not running yet"""
+    global _listener, _listener_pid
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid() and _listener.is_alive():
+            return _listener
+        _listener = CacheInvalidator(cache)
+        _listener_pid = os.getpid()
+        _listener.start()
+        return _listener
+
+
+def listening():
+    """Start the listener if needed; True once it is connected and LISTENing
+
+    Until then (and while it reconnects) other processes' writes go unseen, so
+    lib.db.query bypasses its caches.
+    """
+    listener = _listener
+    if listener is None or _listener_pid != os.getpid() or not listener.is_alive():
+        listener = start_listener()
+    return listener.connected.is_set()
+
+
+def stop_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
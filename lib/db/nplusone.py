@@ -0,0 +1,103 @@
+# lib/db/nplusone.py
+import contextvars
+import os
+import traceback
+import warnings
+from contextlib import ContextDecorator
+
+from lib.db import instrumentation
+
+# What to prefetch instead, keyed by the model method issuing the repeated statement
+PREFETCH_HINTS = {
+    "Article.author": "Article.author() in a loop: load the authors once with "
+                      "SELECT * FROM authors WHERE id = ANY(%s) over all author_ids",
+    "Article.magazine": "Article.magazine() in a loop: load the magazines once with "
+                        "SELECT * FROM magazines WHERE id = ANY(%s) over all magazine_ids",
+    "Author.find_by_id": "authors fetched one by one: use WHERE id = ANY(%s)",
+    "Magazine.find_by_id": "magazines fetched one by one: use WHERE id = ANY(%s)",
+    "Article.find_by_id": "articles fetched one by one: use WHERE id = ANY(%s)",
+    "Author.articles": "Author.articles() per author: fetch articles WHERE author_id = ANY(%s) and group them",
+    "Article.find_by_author": "articles per author: fetch WHERE author_id = ANY(%s) and group them",
+    "Magazine.articles": "Magazine.articles() per magazine: fetch WHERE magazine_id = ANY(%s) and group them",
+    "Article.find_by_magazine": "articles per magazine: fetch WHERE magazine_id = ANY(%s) and group them",
+    "Author.magazines": "Author.magazines() per author: join once over all author ids",
+    "Author.topic_areas": "Author.topic_areas() per author: join once over all author ids",
+    "Magazine.contributors": "Magazine.contributors() per magazine: join once over all magazine ids",
+    "Magazine.article_titles": "Magazine.article_titles() per magazine: fetch titles WHERE magazine_id = ANY(%s)",
+}
+
+DEFAULT_THRESHOLD = int(os.getenv("ARTICLES_NPLUSONE_THRESHOLD", "5"))
+DEFAULT_ACTION = os.getenv("ARTICLES_NPLUSONE", "warn")
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+_scope = contextvars.ContextVar("nplusone_scope", default=None)
+_hook_installed = False
+
+
+def _report(scope, event, count):
+    stack = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if os.sep + os.path.join("lib", "db") + os.sep not in frame.filename
+    ]
+    hint = PREFETCH_HINTS.get(event.method, "batch the lookups into one query")
+    message = (
+        f"N+1 query: {event.method or 'statement'} ran {count} times with different parameters\n"
+        f"  statement: {event.shape}\n"
+        f"  prefetch: {hint}\n"
+        f"  issued from:\n{''.join(traceback.format_list(stack[-scope.stack_depth:]))}"
+    )
+    if scope.action == "raise":
+        raise NPlusOneError(message)
+    warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+
+def _before(event):
+    scope = _scope.get()
+    if scope is None:
+        return
+    seen = scope.params.setdefault(event.shape, set())
+    seen.add(repr(event.params))
+    if len(seen) > scope.threshold and event.shape not in scope.reported:
+        scope.reported.add(event.shape)
+        _report(scope, event, len(seen))
+
+
+class detect(ContextDecorator):
+    """Warn (or raise) when one statement shape repeats with different parameters
+
+        with detect(threshold=5):
+            for art in Article.find_by_title("%ai%"):
+                print(art.author().name)
+    """
+
+    def __init__(self, threshold=None, action=None, stack_depth=8):
+        self.threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+        self.action = action or DEFAULT_ACTION
+        if self.action not in ("warn", "raise"):
+            raise ValueError(f"action must be 'warn' or 'raise', not {self.action!r}")
+        self.stack_depth = stack_depth
+        self.params = {}
+        self.reported = set()
+        self._tokens = []
+
+    def __enter__(self):
+        global _hook_installed
+        if not _hook_installed:
+            instrumentation.add_hook(before=_before)
+            _hook_installed = True
+        self.params = {}
+        self.reported = set()
+        self._tokens.append(_scope.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _scope.reset(self._tokens.pop())
+        return False
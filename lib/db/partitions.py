@@ -0,0 +1,177 @@
+# lib/db/partitions.py
+# Maintenance for the month-partitioned articles table in schema_partitioned.sql.
+#
+#   python -m lib.db.partitions ensure --months-ahead 3
+#   python -m lib.db.partitions archive --older-than 24
+import argparse
+import re
+import time
+from datetime import date
+
+import psycopg2.errors
+
+from lib.db.connection import get_connection
+from lib.db.queries import tables_in
+
+PARTITION_RE = re.compile(r"^articles_p(\d{4})_(\d{2})$")
+_ARTICLES_RE = re.compile(r"\b(?:FROM|JOIN)\s+articles(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_CLAUSE_KEYWORDS = {"where", "join", "on", "group", "order", "limit", "having", "inner", "left", "right"}
+_TAIL_RE = re.compile(r" (?:GROUP BY|HAVING|ORDER BY|LIMIT) ", re.IGNORECASE)
+
+
+def prune(sql, params, since, until=None):
+    """Add a published_at range to a catalog query so the planner skips old partitions
+
+    Intended for the lib.db.queries statements. The range goes into the WHERE
+    clause, ahead of any GROUP BY, HAVING, ORDER BY or LIMIT, on the articles
+    table's alias when it has one. Statements that don't read articles (and
+    writes) come back unchanged. Returns (sql, params).
+    """
+    params = tuple(params or ())
+    match = _ARTICLES_RE.search(sql)
+    if match is None or not sql.lstrip().upper().startswith("SELECT") or "articles" not in tables_in(sql):
+        return sql, params
+    alias = match.group(1)
+    column = f"{alias}.published_at" if alias and alias.lower() not in _CLAUSE_KEYWORDS else "published_at"
+    clause = f"{column} >= %s" + (f" AND {column} < %s" if until is not None else "")
+    bounds = (since,) + ((until,) if until is not None else ())
+    tail_at = _TAIL_RE.search(sql)
+    head, tail = (sql[:tail_at.start()], sql[tail_at.start():]) if tail_at else (sql, "")
+    if " WHERE " in head:
+        before, _, condition = head.partition(" WHERE ")
+        head = f"{before} WHERE {clause} AND ({condition})"
+    else:
+        before = head
+        head = f"{head} WHERE {clause}"
+    # The bounds sit after every placeholder of the part before them
+    split = before.count("%s")
+    return head + tail, params[:split] + bounds + params[split:]
+
+
+def ensure_partitions(months_ahead=3, months_back=0):
+    """Create any missing monthly partitions; returns how many were created"""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT create_article_partitions(%s, %s) AS created",
+                (months_ahead, months_back),
+            )
+            created = cursor.fetchone()["created"]
+        conn.commit()
+        return created
+    finally:
+        conn.close()
+
+
+def list_partitions(conn):
+    """(name, first day of month, detach pending) for every monthly partition, oldest first"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname AS name, i.inhdetachpending AS pending FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'articles'::regclass
+        """)
+        rows = cursor.fetchall()
+    months = []
+    for row in rows:
+        match = PARTITION_RE.match(row["name"])
+        if match:
+            months.append((row["name"], date(int(match.group(1)), int(match.group(2)), 1), row["pending"]))
+    return sorted(months, key=lambda item: item[1])
+
+
+def _detach(conn, sql, lock_timeout, retries, log):
+    """Run sql in its own transaction, retrying when lock_timeout expires"""
+    for attempt in range(retries + 1):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+                for statement in sql:
+                    cursor.execute(statement)
+            conn.commit()
+            return
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == retries:
+                raise
+            log(f"lock not granted within {lock_timeout}, retrying")
+            time.sleep(min(2 ** attempt, 30))
+
+
+def archive_partitions(older_than_months=24, archive_schema="archive", lock_timeout="5s", retries=5, log=print):
+    """Detach partitions older than the cutoff and move them to archive_schema
+
+    articles keeps a default partition for drafts, and PostgreSQL refuses
+    DETACH ... CONCURRENTLY on a table with one, so this is a plain DETACH: it
+    takes an ACCESS EXCLUSIVE lock on articles, blocking reads and writes until
+    it commits. The DETACH and SET SCHEMA share one short transaction;
+    lock_timeout bounds the wait for the lock (so queued queries aren't stuck
+    behind it) and the attempt is retried with backoff up to retries times.
+
+    Partitions left "detach pending" by an interrupted DETACH ... CONCURRENTLY
+    are finished with DETACH ... FINALIZE first.
+    """
+    today = date.today()
+    total = today.year * 12 + today.month - 1 - older_than_months
+    cutoff = date(total // 12, total % 12 + 1, 1)
+    conn = get_connection()
+    archived = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}")
+        conn.commit()
+        partitions = list_partitions(conn)
+        conn.rollback()
+        for name, month, pending in partitions:
+            if pending:
+                log(f"finalizing pending detach of {name}")
+                # FINALIZE can't run inside a transaction block
+                conn.autocommit = True
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SET lock_timeout = %s", (lock_timeout,))
+                        cursor.execute(f"ALTER TABLE articles DETACH PARTITION {name} FINALIZE")
+                        cursor.execute("RESET lock_timeout")
+                finally:
+                    conn.autocommit = False
+                if month >= cutoff:
+                    log(f"{name} is newer than the cutoff; left detached in place")
+                    continue
+                _detach(conn, [f"ALTER TABLE {name} SET SCHEMA {archive_schema}"], lock_timeout, retries, log)
+                archived.append(name)
+                continue
+            if month >= cutoff:
+                break
+            log(f"detaching {name}")
+            _detach(conn, [
+                f"ALTER TABLE articles DETACH PARTITION {name}",
+                f"ALTER TABLE {name} SET SCHEMA {archive_schema}",
+            ], lock_timeout, retries, log)
+            archived.append(name)
+    finally:
+        conn.close()
+    return archived
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lib.db.partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+    ensure.add_argument("--months-back", type=int, default=0)
+    archive = commands.add_parser("archive", help="detach and archive old partitions")
+    archive.add_argument("--older-than", type=int, default=24, help="months")
+    archive.add_argument("--schema", default="archive")
+    archive.add_argument("--lock-timeout", default="5s")
+    archive.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args(argv)
+    if args.command == "ensure":
+        print(f"created {ensure_partitions(args.months_ahead, args.months_back)} partitions")
+    else:
+        archived = archive_partitions(args.older_than, args.schema, args.lock_timeout, args.retries)
+        print(f"archived {len(archived)} partitions")
+
+
+if __name__ == "__main__":
+    main()
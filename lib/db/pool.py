@@ -0,0 +1,238 @@
+# lib/db/pool.py
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+from lib.db import prepared
+from lib.db.breaker import Overloaded
+from lib.db.connection import DB_CONFIG
+from lib.db.metrics import registry
+
+_pools = weakref.WeakSet()
+
+# Connections inherited across fork(). A psycopg2 connection sends Terminate and
+# closes its socket when closed or garbage collected, which would kill the parent's
+# session on the shared socket, so the child keeps them referenced and never uses them.
+_inherited = []
+
+# Longest a checkout waits for a free connection, and how many may wait at once
+CHECKOUT_TIMEOUT = float(os.getenv("ARTICLES_POOL_TIMEOUT", "2"))
+MAX_WAITING = int(os.getenv("ARTICLES_POOL_MAX_WAITING", "32"))
+
+CHECKOUT_WAIT = registry.histogram(
+    "articles_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",)
+)
+registry.function(
+    "articles_pool_connections", "Pooled connections by state",
+    lambda: {
+        key: value
+        for pool in list(_pools)
+        for key, value in (
+            ((pool.name, "in_use"), pool.in_use),
+            ((pool.name, "idle"), len(pool._idle)),
+            ((pool.name, "waiting"), pool.waiting),
+        )
+    },
+    ("pool", "state"),
+)
+registry.function(
+    "articles_pool_max_connections", "Pool size limit",
+    lambda: {(pool.name,): pool.max_size for pool in list(_pools)},
+    ("pool",),
+)
+
+
+def _unique_name(name):
+    """name, or name#2, name#3... so two live pools never share a metrics series"""
+    taken = {pool.name for pool in list(_pools)}
+    candidate, n = name, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{name}#{n}"
+    return candidate
+
+
+class PoolTimeout(Overloaded):
+    """No connection became free before the checkout deadline"""
+
+
+class PoolExhausted(PoolTimeout):
+    """The checkout wait queue is full, so the request was refused without waiting"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of RealDictCursor connections, kept in autocommit mode between checkouts
+
+    When all max_size connections are out, up to max_waiting checkouts queue for
+    at most timeout seconds each; beyond that they fail at once with PoolTimeout
+    or PoolExhausted instead of piling up behind a slow database.
+
+    Fork-safe: a pool used in a new process (pid changed) drops what it inherited
+    without closing it and opens fresh connections on demand.
+    """
+
+    def __init__(self, config=None, min_size=0, max_size=10, timeout=None, max_waiting=None, role="primary"):
+        self.config = config or DB_CONFIG
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = CHECKOUT_TIMEOUT if timeout is None else timeout
+        self.max_waiting = MAX_WAITING if max_waiting is None else max_waiting
+        self.waiting = 0
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._available = threading.Condition()
+        self._pid = os.getpid()
+        self._owned = weakref.WeakSet()
+        self.role = role
+        self.name = _unique_name(f"{role}:{self.config['host']}:{self.config['port']}/{self.config['dbname']}")
+        _pools.add(self)
+        for _ in range(min_size):
+            conn = self._connect()
+            self._owned.add(conn)
+            self._idle.append(conn)
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.config)
+        conn.cursor_factory = RealDictCursor
+        conn.autocommit = True
+        return conn
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self.after_fork()
+
+    def after_fork(self):
+        """Forget the parent's connections in a forked child; new ones are opened lazily"""
+        _inherited.extend(self._owned)
+        self._idle = []
+        self._owned = weakref.WeakSet()
+        self._size = 0
+        self.waiting = 0
+        # The parent's lock may have been held by a thread that doesn't exist here
+        self._available = threading.Condition()
+        self._pid = os.getpid()
+
+    @property
+    def in_use(self):
+        return self._size - len(self._idle)
+
+    def getconn(self, timeout=None):
+        self._check_pid()
+        started = time.perf_counter()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        with self._available:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("pool is closed")
+                if self._idle:
+                    CHECKOUT_WAIT.observe(time.perf_counter() - started, pool=self.name)
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                if self.waiting >= self.max_waiting:
+                    raise PoolExhausted(f"{self.name}: {self.waiting} checkouts already waiting")
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    CHECKOUT_WAIT.observe(time.perf_counter() - started, pool=self.name)
+                    raise PoolTimeout(f"{self.name}: no connection free after {time.perf_counter() - started:.3f} s")
+                self.waiting += 1
+                try:
+                    self._available.wait(remaining)
+                finally:
+                    self.waiting -= 1
+        try:
+            conn = self._connect()
+            self._owned.add(conn)
+        except BaseException:
+            with self._available:
+                self._size -= 1
+                self._available.notify()
+            raise
+        CHECKOUT_WAIT.observe(time.perf_counter() - started, pool=self.name)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        self._check_pid()
+        if conn not in self._owned:
+            # Checked out before a fork and returned in the child
+            _inherited.append(conn)
+            return
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = True
+            except psycopg2.Error:
+                discard = True
+        with self._available:
+            if discard or self._closed or conn.closed:
+                prepared.forget(conn)
+                if not conn.closed:
+                    conn.close()
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._check_pid()
+        with self._available:
+            self._closed = True
+            for conn in self._idle:
+                prepared.forget(conn)
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._available.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool the model layer checks connections out of"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def after_fork():
+    """Make every pool in this process drop its inherited connections
+
+    Registered with os.register_at_fork; call it from a server's post-fork hook
+    (gunicorn post_fork, uwsgi @postfork) when workers are forked outside Python.
+    """
+    global _pool_lock
+    _pool_lock = threading.Lock()
+    for pool in list(_pools):
+        if pool._pid != os.getpid():
+            pool.after_fork()
+
+
+os.register_at_fork(after_in_child=after_fork)
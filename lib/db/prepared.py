@@ -0,0 +1,86 @@
+# lib/db/prepared.py
+import itertools
+import os
+import re
+import threading
+import weakref
+
+import psycopg2
+
+# Server-side statements are per session, so the registry is per connection object
+_registries = weakref.WeakKeyDictionary()
+_names = itertools.count(1)
+_lock = threading.Lock()
+
+MAX_STATEMENTS = 100
+
+stats = {"prepared": 0, "hits": 0, "fallbacks": 0, "resets": 0}
+
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+
+def to_server_params(sql):
+    """Rewrite psycopg2 %s placeholders as $1, $2, ... and return (sql, count)"""
+    counter = itertools.count(1)
+    converted = _PLACEHOLDER_RE.sub(
+        lambda m: "%" if m.group(0) == "%%" else f"${next(counter)}", sql
+    )
+    return converted, next(counter) - 1
+
+
+def registry(conn):
+    with _lock:
+        return _registries.setdefault(conn, {})
+
+
+def forget(conn):
+    """Drop what we know about conn's statements, e.g. when the pool discards or resets it"""
+    with _lock:
+        if _registries.pop(conn, None):
+            stats["resets"] += 1
+
+
+def execute(cursor, sql, params=None, prefix=""):
+    """Run sql via PREPARE on first use per connection and EXECUTE afterwards
+
+    prefix (e.g. a SET LOCAL) is sent in the same string, ahead of the statement.
+    """
+    conn = cursor.connection
+    statements = registry(conn)
+    name = statements.get(sql)
+    args = ", ".join(["%s"] * len(params)) if params else ""
+    if name is None:
+        if len(statements) >= MAX_STATEMENTS:
+            stats["fallbacks"] += 1
+            cursor.execute(prefix + sql, params)
+            return
+        converted, count = to_server_params(sql)
+        name = f"model_stmt_{next(_names)}"
+        # PREPARE and the first EXECUTE share one round trip
+        prepare = f"PREPARE {name} AS {converted}"
+        if params is not None:
+            # psycopg2 only interpolates, and so only unescapes %%, when params are passed
+            prepare = prepare.replace("%", "%%")
+        execute_sql = f"EXECUTE {name} ({args})" if count else f"EXECUTE {name}"
+        cursor.execute(f"{prefix}{prepare}; {execute_sql}", params)
+        statements[sql] = name
+        stats["prepared"] += 1
+        return
+    try:
+        cursor.execute(prefix + (f"EXECUTE {name} ({args})" if args else f"EXECUTE {name}"), params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # The session was reset under us (DISCARD ALL, pooler); start over
+        forget(conn)
+        if conn.autocommit:
+            execute(cursor, sql, params, prefix)
+            return
+        raise
+    stats["hits"] += 1
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,105 @@
+# lib/db/queries.py
+import re
+
+# Every statement the model classes send, keyed by "Model.method"
+QUERIES = {
+    "Author.find_by_id": "SELECT * FROM authors WHERE id = %s",
+    "Author.find_by_name": "SELECT * FROM authors WHERE name ILIKE %s ORDER BY name",
+    "Author.find_by_email": "SELECT id FROM authors WHERE lower(email) = lower(%s)",
+    "Author.all": "SELECT * FROM authors ORDER BY id",
+    "Author.create": "INSERT INTO authors (name, email, bio) VALUES (%s, %s, %s) RETURNING *",
+    "Author.update": "UPDATE authors SET name = %s, email = %s, bio = %s WHERE id = %s",
+    "Author.delete": "DELETE FROM authors WHERE id = %s",
+    "Author.articles": "SELECT * FROM articles WHERE author_id = %s ORDER BY published_at DESC",
+    "Author.magazines": (
+        "SELECT DISTINCT m.* FROM magazines m "
+        "JOIN articles a ON a.magazine_id = m.id WHERE a.author_id = %s"
+    ),
+    "Author.topic_areas": (
+        "SELECT DISTINCT m.category FROM magazines m "
+        "JOIN articles a ON a.magazine_id = m.id WHERE a.author_id = %s"
+    ),
+    "Author.most_prolific": (
+        "SELECT au.*, COUNT(a.id) AS article_count FROM authors au "
+        "JOIN articles a ON a.author_id = au.id "
+        "GROUP BY au.id ORDER BY article_count DESC LIMIT 1"
+    ),
+    "Magazine.find_by_id": "SELECT * FROM magazines WHERE id = %s",
+    "Magazine.find_by_name": "SELECT * FROM magazines WHERE name = %s",
+    "Magazine.find_by_category": "SELECT * FROM magazines WHERE category = %s ORDER BY id",
+    "Magazine.all": "SELECT * FROM magazines ORDER BY id",
+    "Magazine.create": "INSERT INTO magazines (name, category) VALUES (%s, %s) RETURNING *",
+    "Magazine.update": "UPDATE magazines SET name = %s, category = %s WHERE id = %s",
+    "Magazine.delete": "DELETE FROM magazines WHERE id = %s",
+    "Magazine.articles": "SELECT * FROM articles WHERE magazine_id = %s ORDER BY published_at DESC",
+    "Magazine.article_titles": "SELECT title FROM articles WHERE magazine_id = %s ORDER BY published_at DESC",
+    "Magazine.article_count": "SELECT COUNT(*) AS count FROM articles WHERE magazine_id = %s",
+    "Magazine.contributors": (
+        "SELECT DISTINCT au.* FROM authors au "
+        "JOIN articles a ON a.author_id = au.id WHERE a.magazine_id = %s"
+    ),
+    "Magazine.contributing_authors": (
+        "SELECT au.* FROM authors au JOIN articles a ON a.author_id = au.id "
+        "WHERE a.magazine_id = %s GROUP BY au.id HAVING COUNT(a.id) > 2"
+    ),
+    "Magazine.top_publisher": (
+        "SELECT m.*, COUNT(a.id) AS article_count FROM magazines m "
+        "JOIN articles a ON a.magazine_id = m.id "
+        "GROUP BY m.id ORDER BY article_count DESC LIMIT 1"
+    ),
+    "Article.find_by_id": "SELECT * FROM articles WHERE id = %s",
+    "Article.find_by_title": "SELECT * FROM articles WHERE title ILIKE %s ORDER BY id",
+    "Article.find_by_author": "SELECT * FROM articles WHERE author_id = %s ORDER BY published_at DESC",
+    "Article.find_by_magazine": "SELECT * FROM articles WHERE magazine_id = %s ORDER BY published_at DESC",
+    "Article.all": "SELECT * FROM articles ORDER BY id",
+    "Article.create": (
+        "INSERT INTO articles (title, content, author_id, magazine_id) "
+        "VALUES (%s, %s, %s, %s) RETURNING *"
+    ),
+    "Article.update": (
+        "UPDATE articles SET title = %s, content = %s, author_id = %s, magazine_id = %s, "
+        "updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+    ),
+    "Article.delete": "DELETE FROM articles WHERE id = %s",
+    "Article.author": "SELECT * FROM authors WHERE id = %s",
+    "Article.magazine": "SELECT * FROM magazines WHERE id = %s",
+}
+
+WRITE_METHODS = ("create", "update", "delete")
+
+# Primary-key lookups served from lib.db.cache.model_cache: method -> table whose
+# id is the first parameter
+ID_LOOKUPS = {
+    "Article.find_by_id": "articles",
+    "Author.find_by_id": "authors",
+    "Magazine.find_by_id": "magazines",
+    "Article.author": "authors",
+    "Article.magazine": "magazines",
+}
+
+# Small, hot reads served from lib.db.query_cache between writes to their tables
+CACHED_METHODS = frozenset({
+    "Author.all",
+    "Magazine.find_by_name",
+    "Magazine.find_by_category",
+    "Magazine.all",
+})
+
+# statement_timeout in ms for methods that can run away; the ILIKE searches scan
+# the whole table when the pattern is too short for the trigram index
+STATEMENT_TIMEOUTS = {
+    "Author.find_by_name": 2000,
+    "Article.find_by_title": 2000,
+}
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+def is_read(name):
+    """True for the finders, listings, relationship getters and stats methods"""
+    return name.split(".", 1)[1] not in WRITE_METHODS
+
+
+def tables_in(sql):
+    """Tables a statement reads or writes, in order of appearance"""
+    return tuple(dict.fromkeys(t.lower() for t in _TABLE_RE.findall(sql)))
@@ -0,0 +1,236 @@
+# lib/db/query.py
+import contextvars
+import os
+from contextlib import contextmanager
+
+import psycopg2.errors
+
+from lib.db import instrumentation
+from lib.db import memprof
+from lib.db import metrics
+from lib.db import notify
+from lib.db import prepared as prepared_statements
+from lib.db import slowlog
+from lib.db.bloom import email_bloom
+from lib.db.breaker import Overloaded, breaker
+from lib.db.cache import MISSING, model_cache
+from lib.db.pool import get_pool
+from lib.db.queries import CACHED_METHODS, ID_LOOKUPS, QUERIES, STATEMENT_TIMEOUTS, is_read, tables_in
+from lib.db.query_cache import query_cache
+from lib.db.routing import get_router, primary
+
+# (connection, tables written, [statement_timeout in effect]) of the transaction()
+# open in the current thread or task
+_current = contextvars.ContextVar("current_transaction", default=None)
+_timeout = contextvars.ContextVar("statement_timeout", default=None)
+_uncached = contextvars.ContextVar("uncached", default=False)
+
+# ARTICLES_SLOW_QUERY_MS turns on the slow-query log for every model statement
+slow_query_log = slowlog.install_from_env()
+
+# ARTICLES_METRICS=1 records every model statement; ARTICLES_METRICS_PORT serves /metrics
+metrics_server = metrics.install_from_env()
+
+# statement_timeout (ms) for methods not in STATEMENT_TIMEOUTS; unset keeps the server's
+DEFAULT_STATEMENT_TIMEOUT = int(os.getenv("ARTICLES_STATEMENT_TIMEOUT_MS", "0")) or None
+
+
+class StatementTimeout(Overloaded):
+    """The server cancelled a statement that ran past its statement_timeout"""
+
+    def __init__(self, method, timeout):
+        super().__init__(f"{method or 'statement'} exceeded statement_timeout of {timeout} ms")
+        self.method = method
+        self.timeout = timeout
+
+
+@contextmanager
+def statement_timeout(ms):
+    """Timeout for every model statement in the block, over the per-model defaults
+
+        with statement_timeout(500):
+            Article.find_by_title("%a%")
+
+    A timeout= passed to the call itself still wins. 0 disables the timeout.
+    """
+    token = _timeout.set(ms)
+    try:
+        yield
+    finally:
+        _timeout.reset(token)
+
+
+@contextmanager
+def uncached():
+    """Send every run() in the block to the database, past model_cache, query_cache and email_bloom"""
+    token = _uncached.set(True)
+    try:
+        yield
+    finally:
+        _uncached.reset(token)
+
+
+@contextmanager
+def read_connection():
+    """Connection for pure reads: autocommit, so no BEGIN/COMMIT and never idle in transaction
+
+    Served by a replica unless this session wrote recently (see lib.db.routing).
+    Fails fast with CircuitOpen while the breaker is open (see lib.db.breaker).
+    """
+    current = _current.get()
+    if current is not None:
+        # Inside a write transaction reads must see its uncommitted rows
+        yield current[0]
+        return
+    with breaker.guard():
+        with get_router().read_connection() as conn:
+            yield conn
+
+
+@contextmanager
+def transaction():
+    """Explicit transaction for writes; commits on success and rolls back on error"""
+    current = _current.get()
+    if current is not None:
+        yield current[0]
+        return
+    pool = get_pool()
+    with breaker.guard():
+        conn = pool.getconn()
+        conn.autocommit = False
+        written = set()
+        token = _current.set((conn, written, [None]))
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _current.reset(token)
+            pool.putconn(conn)
+    # Only after COMMIT, so nobody re-caches the old rows under the new version
+    for table in written:
+        query_cache.bump(table)
+    if written:
+        get_router().mark_write()
+
+
+def _timeout_prefix(conn, method, timeout):
+    """SET LOCAL for the statement about to run, sent in the same string
+
+    In autocommit the pair runs as one implicit transaction, so the setting ends
+    with the statement. Inside transaction() it lasts until COMMIT, so it is only
+    sent when it changes.
+    """
+    if timeout is None:
+        timeout = _timeout.get()
+    if timeout is None:
+        timeout = STATEMENT_TIMEOUTS.get(method, DEFAULT_STATEMENT_TIMEOUT)
+    current = _current.get()
+    if current is not None and current[0] is conn:
+        applied = current[2]
+        if applied[0] == timeout:
+            return "", timeout
+        applied[0] = timeout
+        if timeout is None:
+            return "SET LOCAL statement_timeout = DEFAULT; ", timeout
+    elif timeout is None:
+        return "", timeout
+    return f"SET LOCAL statement_timeout = {int(timeout)}; ", timeout
+
+
+def _execute(cursor, sql, params, prepared, method, timeout=None):
+    prefix, timeout = _timeout_prefix(cursor.connection, method, timeout)
+
+    def runner():
+        if prepared:
+            return prepared_statements.execute(cursor, sql, params, prefix)
+        return cursor.execute(prefix + sql, params)
+
+    try:
+        instrumentation.execute(cursor, sql, params, method, runner)
+    except psycopg2.errors.QueryCanceled as error:
+        raise StatementTimeout(method, timeout) from error
+
+
+def fetch_all(sql, params=None, prepared=False, method=None, timeout=None):
+    with read_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, sql, params, prepared, method, timeout)
+            return cursor.fetchall()
+
+
+def fetch_one(sql, params=None, prepared=False, method=None, timeout=None):
+    with read_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, sql, params, prepared, method, timeout)
+            return cursor.fetchone()
+
+
+def execute(sql, params=None, prepared=False, method=None, timeout=None):
+    """Run a write in the current transaction, or in its own one; returns RETURNING rows or the rowcount"""
+    with transaction() as conn:
+        _current.get()[1].update(tables_in(sql))
+        with conn.cursor() as cursor:
+            _execute(cursor, sql, params, prepared, method, timeout)
+            return cursor.fetchall() if cursor.description else cursor.rowcount
+
+
+def run(name, *params, timeout=None):
+    """Execute a model method's statement from lib.db.queries, choosing the read or write path
+
+    Catalog statements are few and hot, so they always go through prepared statements.
+    Outside a transaction, ID_LOOKUPS are answered from model_cache (absent ids
+    included), CACHED_METHODS from query_cache, and Author.find_by_email skips
+    the query when email_bloom rules the email out, while the NOTIFY listener
+    (started on first use) keeps all three in step with other processes.
+    timeout (ms) overrides statement_timeout() and STATEMENT_TIMEOUTS for this call.
+    """
+    if memprof.ENABLED:
+        return memprof.profile.call(name, _run, name, params, timeout)
+    return _run(name, params, timeout)
+
+
+def _run(name, params, timeout):
+    sql = QUERIES[name]
+    if _current.get() is None and not _uncached.get():
+        table = ID_LOOKUPS.get(name)
+        # Right after this session's own write, its NOTIFY may not have evicted the old row yet
+        if table is not None and notify.listening() and not get_router().sticky():
+            return _find_by_id(name, table, sql, params, timeout)
+        if name in CACHED_METHODS and notify.listening():
+            return query_cache.fetch(sql, params, lambda sql, params: _load(name, sql, params, timeout))
+        if name == "Author.find_by_email" and notify.listening() and not email_bloom.may_exist(params[0]):
+            return []
+    if is_read(name):
+        return fetch_all(sql, params or None, prepared=True, method=name, timeout=timeout)
+    result = execute(sql, params or None, prepared=True, method=name, timeout=timeout)
+    if name in ("Author.create", "Author.update"):
+        email_bloom.add(params[1])
+    return result
+
+
+def _find_by_id(name, table, sql, params, timeout):
+    row_id = params[0]
+    row = model_cache.get(table, row_id)
+    if row is not None:
+        return [] if row is MISSING else [dict(row)]
+    # query_cache's table version moves on every local commit and every NOTIFY
+    versions = query_cache.snapshot((table,))
+    rows = _load(name, sql, params, timeout)
+    if query_cache.snapshot((table,)) == versions:
+        if rows:
+            model_cache.set(table, row_id, dict(rows[0]))
+        else:
+            # Crawlers probe deleted and made-up ids over and over
+            model_cache.set_missing(table, row_id)
+    return rows
+
+
+def _load(name, sql, params, timeout):
+    # Misses read the primary: a lagging replica could hand back rows from before
+    # the last bump(), which would then be cached under the new version
+    with primary():
+        return fetch_all(sql, params or None, prepared=True, method=name, timeout=timeout)
@@ -0,0 +1,122 @@
+# lib/db/query_cache.py
+import os
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+from lib.db.queries import tables_in
+
+
+def _sizeof(columns, rows):
+    size = sys.getsizeof(rows) + sys.getsizeof(columns)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class QueryCache:
+    """Result cache keyed by (sql, params), invalidated by per-table version counters"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def bump(self, table):
+        """Called after every write to a table; outdates every result that read it"""
+        with self._lock:
+            self._versions[table] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry[3]
+
+    def get(self, sql, params=()):
+        """Return the cached rows as dicts, or None on a miss"""
+        key = (sql, tuple(params or ()))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            columns, rows, versions, _ = entry
+            if any(self._versions[table] != version for table, version in versions):
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [dict(zip(columns, row)) for row in rows]
+
+    def snapshot(self, tables):
+        with self._lock:
+            return tuple((table, self._versions[table]) for table in tables)
+
+    def put(self, sql, params, rows, versions=None):
+        """Store rows (dicts from RealDictCursor) as a column tuple plus value tuples
+
+        Pass the snapshot() taken before running the query, so a write that
+        lands while it runs leaves the entry already stale.
+        """
+        key = (sql, tuple(params or ()))
+        columns = tuple(rows[0].keys()) if rows else ()
+        values = tuple(tuple(row.values()) for row in rows)
+        size = _sizeof(columns, values)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if versions is None:
+                versions = tuple((table, self._versions[table]) for table in tables_in(sql))
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (columns, values, versions, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def fetch(self, sql, params, loader):
+        """Return cached rows, or call loader(sql, params) and cache what it returns"""
+        rows = self.get(sql, params)
+        if rows is None:
+            versions = self.snapshot(tables_in(sql))
+            rows = loader(sql, params)
+            self.put(sql, params, rows, versions)
+        return rows
+
+    def clear(self):
+        """Drop every entry and outdate every version, so loads already running aren't stored"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            for table in self._versions:
+                self._versions[table] += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+query_cache = QueryCache()
+
+
+def _after_fork():
+    query_cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,131 @@
+# lib/db/routing.py
+import contextvars
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from lib.db.connection import REPLICA_STRATEGY, REPLICAS
+from lib.db.pool import ConnectionPool, get_pool
+
+# When the current session last committed a write, and whether it forced the primary
+_last_write = contextvars.ContextVar("last_write", default=None)
+_force_primary = contextvars.ContextVar("force_primary", default=False)
+
+STRATEGIES = ("round_robin", "least_connections")
+
+
+class ReplicaRouter:
+    """Sends model reads to replicas, except for sessions that wrote recently"""
+
+    def __init__(self, replicas=(), strategy="round_robin", sticky_seconds=5.0, retry_after=10.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.pools = [ConnectionPool(config, role="replica") for config in replicas]
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.retry_after = retry_after
+        self._cycle = itertools.cycle(range(len(self.pools)))
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self):
+        """Called after a commit; this session's reads go to the primary for sticky_seconds"""
+        _last_write.set(time.monotonic())
+
+    def sticky(self):
+        """True while this session's reads must go to the primary"""
+        if _force_primary.get():
+            return True
+        last = _last_write.get()
+        return last is not None and time.monotonic() - last < self.sticky_seconds
+
+    def _healthy(self):
+        now = time.monotonic()
+        return [i for i in range(len(self.pools)) if self._down_until.get(i, 0) <= now]
+
+    def _pick(self):
+        with self._lock:
+            healthy = self._healthy()
+            if not healthy:
+                return None
+            if self.strategy == "least_connections":
+                return min(healthy, key=lambda i: self.pools[i].in_use)
+            for _ in range(len(self.pools)):
+                index = next(self._cycle)
+                if index in healthy:
+                    return index
+            return None
+
+    def mark_down(self, index):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+
+    @contextmanager
+    def read_connection(self):
+        """A replica connection, or the primary when sticky, forced or no replica is up"""
+        index = None if self.sticky() else self._pick()
+        if index is None:
+            with get_pool().connection() as conn:
+                yield conn
+            return
+        pool = self.pools[index]
+        conn = None
+        try:
+            conn = pool.getconn()
+        except psycopg2.OperationalError:
+            self.mark_down(index)
+        if conn is None:
+            with get_pool().connection() as conn:
+                yield conn
+            return
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            self.mark_down(index)
+            pool.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            pool.putconn(conn)
+            raise
+        else:
+            pool.putconn(conn)
+
+    def closeall(self):
+        for pool in self.pools:
+            pool.closeall()
+
+
+@contextmanager
+def primary():
+    """Force every read in this block onto the primary"""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ReplicaRouter(REPLICAS, REPLICA_STRATEGY)
+        return _router
+
+
+def _after_fork():
+    global _router_lock
+    _router_lock = threading.Lock()
+    if _router is not None:
+        _router._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
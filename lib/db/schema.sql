@@ -42,6 +42,41 @@ CREATE TABLE IF NOT EXISTS author_magazine (
     PRIMARY KEY (author_id, magazine_id)
 );
 
-CREATE INDEX idx_articles_author ON articles(author_id);
-CREATE INDEX idx_articles_magazine ON articles(magazine_id);
-CREATE INDEX idx_articles_published ON articles(published_at) WHERE status = 'published';
\ No newline at end of file
+-- Every statement in lib/db/queries.py has an index it can use (see Create/tests/test_indexes.py).
+-- INCLUDE columns let article_titles, article_count, contributors, magazines() and
+-- topic_areas() run as index-only scans.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_authors_email_lower ON authors (lower(email));
+CREATE INDEX idx_authors_name_trgm ON authors USING gin (name gin_trgm_ops);
+CREATE INDEX idx_magazines_name ON magazines (name);
+CREATE INDEX idx_magazines_category ON magazines (category, id);
+CREATE INDEX idx_articles_author ON articles (author_id, published_at DESC) INCLUDE (magazine_id, id);
+CREATE INDEX idx_articles_magazine ON articles (magazine_id, published_at DESC) INCLUDE (title, author_id, id);
+CREATE INDEX idx_articles_title_trgm ON articles USING gin (title gin_trgm_ops);
+CREATE INDEX idx_articles_published ON articles(published_at) WHERE status = 'published';
+-- Cache invalidation: every row change is broadcast as {table, id, op} on model_changes
+-- The table is passed as a trigger argument: on the partitioned articles table the
+-- row trigger fires on the leaf partition, so TG_TABLE_NAME would name that instead.
+CREATE OR REPLACE FUNCTION notify_model_change() RETURNS trigger AS $$
+DECLARE
+    row_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    PERFORM pg_notify('model_changes', json_build_object(
+        'table', TG_ARGV[0], 'id', row_id, 'op', TG_OP
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER authors_notify AFTER INSERT OR UPDATE OR DELETE ON authors
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('authors');
+CREATE TRIGGER magazines_notify AFTER INSERT OR UPDATE OR DELETE ON magazines
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('magazines');
+CREATE TRIGGER articles_notify AFTER INSERT OR UPDATE OR DELETE ON articles
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('articles');
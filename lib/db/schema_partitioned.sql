@@ -0,0 +1,115 @@
+
+DROP TABLE IF EXISTS author_magazine CASCADE;
+DROP TABLE IF EXISTS articles CASCADE;
+DROP TABLE IF EXISTS authors CASCADE;
+DROP TABLE IF EXISTS magazines CASCADE;
+
+CREATE TABLE IF NOT EXISTS authors (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    bio TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS magazines (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    category VARCHAR(255) NOT NULL,
+    description TEXT,
+    frequency VARCHAR(50) CHECK (frequency IN ('weekly', 'monthly', 'quarterly', 'yearly')),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Range-partitioned by month on published_at. Unpublished drafts (NULL published_at)
+-- land in the default partition. A primary key would have to include published_at,
+-- which drafts leave NULL, so id uniqueness rests on the sequence and idx_articles_id.
+CREATE TABLE IF NOT EXISTS articles (
+    id SERIAL NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    published_at TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) CHECK (status IN ('draft', 'published', 'archived')) DEFAULT 'draft',
+    author_id INTEGER NOT NULL REFERENCES authors(id) ON DELETE CASCADE,
+    magazine_id INTEGER REFERENCES magazines(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT title_min_length CHECK (length(title) >= 5),
+    CONSTRAINT content_min_length CHECK (length(content) >= 100)
+) PARTITION BY RANGE (published_at);
+
+CREATE TABLE IF NOT EXISTS articles_default PARTITION OF articles DEFAULT;
+
+-- Creates any missing monthly partitions from months_back before the current month
+-- through months_ahead after it; run it from cron (or python -m lib.db.partitions
+-- ensure) so inserts never have to fall back on the default partition.
+CREATE OR REPLACE FUNCTION create_article_partitions(months_ahead INTEGER DEFAULT 3, months_back INTEGER DEFAULT 0)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', CURRENT_DATE) - make_interval(months => months_back);
+    created INTEGER := 0;
+    partition_name TEXT;
+BEGIN
+    FOR i IN 0..months_ahead + months_back LOOP
+        partition_name := 'articles_p' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF articles FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_article_partitions(3, 24);
+
+CREATE TABLE IF NOT EXISTS author_magazine (
+    author_id INTEGER NOT NULL REFERENCES authors(id) ON DELETE CASCADE,
+    magazine_id INTEGER NOT NULL REFERENCES magazines(id) ON DELETE CASCADE,
+    role VARCHAR(50),
+    PRIMARY KEY (author_id, magazine_id)
+);
+
+CREATE INDEX idx_articles_id ON articles(id);
+-- Every statement in lib/db/queries.py has an index it can use (see Create/tests/test_indexes.py).
+-- INCLUDE columns let article_titles, article_count, contributors, magazines() and
+-- topic_areas() run as index-only scans.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_authors_email_lower ON authors (lower(email));
+CREATE INDEX idx_authors_name_trgm ON authors USING gin (name gin_trgm_ops);
+CREATE INDEX idx_magazines_name ON magazines (name);
+CREATE INDEX idx_magazines_category ON magazines (category, id);
+CREATE INDEX idx_articles_author ON articles (author_id, published_at DESC) INCLUDE (magazine_id, id);
+CREATE INDEX idx_articles_magazine ON articles (magazine_id, published_at DESC) INCLUDE (title, author_id, id);
+CREATE INDEX idx_articles_title_trgm ON articles USING gin (title gin_trgm_ops);
+CREATE INDEX idx_articles_published ON articles(published_at) WHERE status = 'published';
+-- Cache invalidation: every row change is broadcast as {table, id, op} on model_changes
+-- The table is passed as a trigger argument: on the partitioned articles table the
+-- row trigger fires on the leaf partition, so TG_TABLE_NAME would name that instead.
+CREATE OR REPLACE FUNCTION notify_model_change() RETURNS trigger AS $$
+DECLARE
+    row_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    PERFORM pg_notify('model_changes', json_build_object(
+        'table', TG_ARGV[0], 'id', row_id, 'op', TG_OP
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER authors_notify AFTER INSERT OR UPDATE OR DELETE ON authors
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('authors');
+CREATE TRIGGER magazines_notify AFTER INSERT OR UPDATE OR DELETE ON magazines
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('magazines');
+CREATE TRIGGER articles_notify AFTER INSERT OR UPDATE OR DELETE ON articles
+    FOR EACH ROW EXECUTE FUNCTION notify_model_change('articles');
@@ -0,0 +1,280 @@
+# lib/db/seed.py
+# Deterministic synthetic data for authors, magazines, articles and author_magazine.
+#
+#   python -m lib.db.seed --articles 1m --seed 42 --workers 8 --truncate
+#
+# The same (seed, scale, anchor) always yields the same rows, however many
+# workers load them: each chunk of articles has its own seeded generator.
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import multiprocessing
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+from lib.db.connection import get_connection
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000, "100m": 100_000_000}
+
+CATEGORIES = [
+    "Technology", "Science", "Business", "Health", "Politics", "Sports", "Culture",
+    "Travel", "Food", "Fashion", "Education", "Environment", "Finance", "Design",
+]
+FREQUENCIES = ["weekly", "monthly", "quarterly", "yearly"]
+FIRST_NAMES = [
+    "Jane", "John", "Amina", "Brian", "Wanjiru", "Kevin", "Achieng", "Peter", "Njeri", "David",
+    "Grace", "Samuel", "Faith", "Daniel", "Mercy", "Joseph", "Esther", "Paul", "Ruth", "Victor",
+]
+LAST_NAMES = [
+    "Wambui", "Otieno", "Kamau", "Mwangi", "Odhiambo", "Kioko", "Njoroge", "Mutua", "Chebet",
+    "Kiprop", "Wanjala", "Omondi", "Ndungu", "Achieng", "Kariuki", "Barasa", "Nyambura", "Kimani",
+]
+WORDS = (
+    "data model query index latency article author magazine future research analysis "
+    "market growth health science policy design culture travel city energy climate "
+    "learning system network security open source product team strategy report trend "
+    "innovation community story interview review guide practice insight platform"
+).split()
+
+ZIPF_EXPONENT = 1.1
+CHUNK_SIZE = 50_000
+COPY_BATCH = 10_000
+
+ARTICLE_COLUMNS = ("id", "title", "content", "published_at", "status", "author_id", "magazine_id")
+
+
+def parse_scale(value):
+    value = value.lower().replace("_", "")
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def sizes(articles):
+    """(authors, magazines) for a given article count"""
+    return max(10, articles // 20), max(5, articles // 500)
+
+
+def _author_rank(author_id, authors):
+    # Scatter Zipf ranks over ids so the prolific authors are not simply 1, 2, 3...
+    return (author_id * 2654435761) % authors + 1
+
+
+def author_weights(authors):
+    """Cumulative Zipf weights indexed by author_id - 1"""
+    return list(itertools.accumulate(
+        1.0 / _author_rank(author_id, authors) ** ZIPF_EXPONENT for author_id in range(1, authors + 1)
+    ))
+
+
+def home_magazines(author_id, magazines):
+    """The one to three magazines an author writes for"""
+    count = 1 + author_id % 3
+    return sorted({(author_id * 7919 + k * 104729) % magazines + 1 for k in range(count)})
+
+
+_sentence_pools = {}
+
+
+def _sentences(seed):
+    """A fixed pool of sentences per seed; articles are stitched together from it"""
+    if seed not in _sentence_pools:
+        rng = random.Random(f"{seed}:sentences")
+        _sentence_pools[seed] = [
+            " ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + "."
+            for _ in range(5_000)
+        ]
+    return _sentence_pools[seed]
+
+
+def _content(rng, sentences):
+    # Log-normal lengths around 2-3k characters, never below the 100-char constraint
+    length = max(120, min(20_000, int(rng.lognormvariate(7.6, 0.6))))
+    text = " ".join(rng.choices(sentences, k=length // 60 + 2))
+    while len(text) < length:
+        text += " " + rng.choice(sentences)
+    return text[:length]
+
+
+def generate_authors(count, seed):
+    rng = random.Random(f"{seed}:authors")
+    for author_id in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield (author_id, name, f"author{author_id}@example.com", f"Writes about {rng.choice(CATEGORIES).lower()}.")
+
+
+def generate_magazines(count, seed):
+    rng = random.Random(f"{seed}:magazines")
+    for magazine_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        yield (magazine_id, f"{category} {rng.choice(WORDS).title()} {magazine_id}", category,
+               f"A {category.lower()} magazine.", rng.choice(FREQUENCIES))
+
+
+def generate_author_magazine(authors, magazines):
+    for author_id in range(1, authors + 1):
+        for magazine_id in home_magazines(author_id, magazines):
+            yield (author_id, magazine_id, "contributor")
+
+
+def generate_articles(chunk, total, seed, anchor, cumulative=None):
+    """Rows for one chunk of article ids; identical for a given (chunk, total, seed, anchor)"""
+    authors, magazines = sizes(total)
+    cumulative = cumulative or author_weights(authors)
+    rng = random.Random(f"{seed}:articles:{chunk}")
+    sentences = _sentences(seed)
+    start = chunk * CHUNK_SIZE
+    horizon = 2 * 365 * 24 * 3600
+    for article_id in range(start + 1, min(start + CHUNK_SIZE, total) + 1):
+        author_id = bisect.bisect(cumulative, rng.random() * cumulative[-1]) + 1
+        author_id = min(author_id, authors)
+        homes = home_magazines(author_id, magazines)
+        magazine_id = rng.choice(homes) if rng.random() < 0.9 else rng.randint(1, magazines)
+        roll = rng.random()
+        if roll < 0.15:
+            status, published_at = "draft", None
+        else:
+            status = "archived" if roll < 0.2 else "published"
+            published_at = anchor - timedelta(seconds=int(horizon * rng.random() ** 2))
+        title = f"{' '.join(rng.choices(WORDS, k=rng.randint(2, 7))).title()} {article_id}"
+        yield (article_id, title, _content(rng, sentences), published_at, status, author_id, magazine_id)
+
+
+def copy_rows(conn, table, columns, rows):
+    """COPY rows into table in batches of COPY_BATCH; returns the row count"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    count = 0
+    with conn.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, COPY_BATCH))
+            if not batch:
+                break
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(["" if value is None else value for value in row] for row in batch)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            count += len(batch)
+    return count
+
+
+_worker_weights = None
+
+
+def _load_chunk(args):
+    global _worker_weights
+    chunk, total, seed, anchor = args
+    if _worker_weights is None:
+        _worker_weights = author_weights(sizes(total)[0])
+    conn = get_connection()
+    try:
+        count = copy_rows(conn, "articles", ARTICLE_COLUMNS,
+                          generate_articles(chunk, total, seed, anchor, _worker_weights))
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def _set_user_triggers(conn, enabled):
+    """Turn the NOTIFY triggers on authors, magazines and articles off or back on
+
+    Reconnects when conn was lost, so a failed load still re-enables them.
+    """
+    own = conn.closed
+    if own:
+        conn = get_connection()
+    try:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            for table in ("authors", "magazines", "articles"):
+                cursor.execute(f"ALTER TABLE {table} {'ENABLE' if enabled else 'DISABLE'} TRIGGER USER")
+        conn.commit()
+    finally:
+        if own:
+            conn.close()
+
+
+def seed(articles=1_000, seed_value=42, workers=None, anchor=None, truncate=False, log=print,
+         disable_triggers=None):
+    """Load a full data set; returns {table: rows loaded}
+
+    The NOTIFY triggers are disabled for the load only with truncate or an
+    explicit disable_triggers=True: ALTER TABLE ... DISABLE TRIGGER USER takes
+    an ACCESS EXCLUSIVE lock, and while it holds no session's writes notify
+    the cache listeners. Otherwise they stay on and fire once per row.
+    """
+    if disable_triggers is None:
+        disable_triggers = truncate
+    if anchor is None:
+        anchor = datetime.combine(date.today().replace(day=1), time(), tzinfo=timezone.utc)
+    authors, magazines = sizes(articles)
+    conn = get_connection()
+    loaded = {}
+    try:
+        if truncate:
+            with conn.cursor() as cursor:
+                cursor.execute("TRUNCATE author_magazine, articles, authors, magazines RESTART IDENTITY CASCADE")
+            conn.commit()
+        # One pg_notify per COPYed row would swamp the cache listeners
+        if disable_triggers:
+            _set_user_triggers(conn, False)
+        try:
+            loaded["authors"] = copy_rows(conn, "authors", ("id", "name", "email", "bio"),
+                                          generate_authors(authors, seed_value))
+            loaded["magazines"] = copy_rows(conn, "magazines", ("id", "name", "category", "description", "frequency"),
+                                            generate_magazines(magazines, seed_value))
+            loaded["author_magazine"] = copy_rows(conn, "author_magazine", ("author_id", "magazine_id", "role"),
+                                                  generate_author_magazine(authors, magazines))
+            conn.commit()
+            log(f"loaded {authors} authors and {magazines} magazines")
+
+            chunks = [(chunk, articles, seed_value, anchor)
+                      for chunk in range((articles + CHUNK_SIZE - 1) // CHUNK_SIZE)]
+            loaded["articles"] = 0
+            with multiprocessing.Pool(workers) as pool:
+                for count in pool.imap_unordered(_load_chunk, chunks):
+                    loaded["articles"] += count
+                    log(f"loaded {loaded['articles']}/{articles} articles")
+
+            with conn.cursor() as cursor:
+                for table in ("authors", "magazines", "articles"):
+                    cursor.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                    )
+            conn.commit()
+        finally:
+            # Left disabled, cross-process cache invalidation would silently stop for good
+            if disable_triggers:
+                _set_user_triggers(conn, True)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE authors, magazines, articles, author_magazine")
+    finally:
+        conn.close()
+    return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lib.db.seed")
+    parser.add_argument("--articles", type=parse_scale, default=1_000,
+                        help="article count or scale name (1k, 10k, 100k, 1m, 10m, 100m)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="newest publication date, YYYY-MM-DD (default: first of this month)")
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the tables first; also disables the NOTIFY triggers for the load")
+    parser.add_argument("--disable-triggers", action="store_true", default=None,
+                        help="disable the NOTIFY triggers without --truncate (locks the tables, "
+                             "silences every session's invalidations until the load ends)")
+    args = parser.parse_args(argv)
+    anchor = datetime.combine(args.anchor, time(), tzinfo=timezone.utc) if args.anchor else None
+    loaded = seed(args.articles, args.seed, args.workers, anchor, args.truncate,
+                  disable_triggers=args.disable_triggers)
+    print(", ".join(f"{count} {table}" for table, count in loaded.items()))
+
+
+if __name__ == "__main__":
+    main()
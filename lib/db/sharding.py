@@ -0,0 +1,275 @@
+# lib/db/sharding.py
+# Optional hash sharding of the articles table by magazine_id.
+#
+# Authors and magazines stay on the primary; each shard database holds only
+# articles (see SHARD_SCHEMA). Ids come from the primary's articles_id_seq so
+# they stay unique across shards and survive rebalancing.
+#
+#   python -m lib.db.sharding rebalance --from "h:5433/a,h:5434/b" --to "h:5433/a,h:5434/b,h:5435/c"
+import argparse
+import bisect
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.db import query
+from lib.db.breaker import breaker
+from lib.db.connection import SHARDS, _server_configs
+from lib.db.pool import ConnectionPool, get_pool
+from lib.db.queries import tables_in
+
+SHARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    published_at TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) CHECK (status IN ('draft', 'published', 'archived')) DEFAULT 'draft',
+    author_id INTEGER NOT NULL,
+    magazine_id INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT title_min_length CHECK (length(title) >= 5),
+    CONSTRAINT content_min_length CHECK (length(content) >= 100)
+);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_articles_author ON articles (author_id, published_at DESC) INCLUDE (magazine_id, id);
+CREATE INDEX IF NOT EXISTS idx_articles_magazine ON articles (magazine_id, published_at DESC)
+    INCLUDE (title, author_id, id);
+CREATE INDEX IF NOT EXISTS idx_articles_title_trgm ON articles USING gin (title gin_trgm_ops);
+"""
+
+ARTICLE_COLUMNS = (
+    "id", "title", "content", "published_at", "status",
+    "author_id", "magazine_id", "created_at", "updated_at",
+)
+
+# Separate from fanout's executor: a fan_out task calling scatter() would
+# otherwise wait on futures queued behind itself
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="scatter")
+    return _executor
+
+
+def _after_fork():
+    global _executor
+    _executor = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _newest_first(row):
+    """Sort key matching ORDER BY published_at DESC (NULLs first) once reversed"""
+    return row["published_at"] is None, row["published_at"]
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+def shard_name(config):
+    return f"{config['host']}:{config['port']}/{config['dbname']}"
+
+
+class HashRing:
+    """Consistent hash ring; adding a shard moves only about 1/N of the magazines"""
+
+    def __init__(self, names, vnodes=100):
+        self.names = list(names)
+        points = sorted(
+            (_hash(f"{name}#{v}"), index)
+            for index, name in enumerate(self.names)
+            for v in range(vnodes)
+        )
+        self._keys = [point for point, _ in points]
+        self._owners = [index for _, index in points]
+
+    def lookup(self, magazine_id):
+        """Index of the shard owning magazine_id; articles without a magazine share one shard"""
+        position = bisect.bisect(self._keys, _hash(str(magazine_id))) % len(self._keys)
+        return self._owners[position]
+
+
+class ShardedArticles:
+    """Article reads and writes routed by magazine_id, scatter-gathered when it is unknown"""
+
+    def __init__(self, shards=None):
+        shards = shards or SHARDS
+        if not shards:
+            raise ValueError("No shards configured; set DB_SHARDS")
+        self.configs = list(shards)
+        self.ring = HashRing(shard_name(config) for config in self.configs)
+        self.pools = [ConnectionPool(config, role="shard") for config in self.configs]
+
+    def pool_for(self, magazine_id):
+        return self.pools[self.ring.lookup(magazine_id)]
+
+    def _query(self, pool, sql, params=None):
+        # A shard down or overloaded trips the same breaker as the primary
+        with breaker.guard():
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    query._execute(cursor, sql, params, False, None)
+                    return cursor.fetchall() if cursor.description else cursor.rowcount
+
+    def create(self, title, content, author_id, magazine_id):
+        [row] = self._query(get_pool(), "SELECT nextval('articles_id_seq') AS id")
+        article_id = row["id"]
+        rows = self._query(
+            self.pool_for(magazine_id),
+            "INSERT INTO articles (id, title, content, author_id, magazine_id) "
+            "VALUES (%s, %s, %s, %s, %s) RETURNING *",
+            (article_id, title, content, author_id, magazine_id),
+        )
+        return rows[0]
+
+    def on_magazine(self, magazine_id, sql, params):
+        """Run a magazine-scoped query (find_by_magazine, article_titles, article_count) on its shard
+
+        Shards hold only articles, so statements joining authors or magazines
+        (contributors, contributing_authors) are refused with ValueError.
+        """
+        foreign = [table for table in tables_in(sql) if table != "articles"]
+        if foreign:
+            raise ValueError(f"shards hold only articles; cannot run a query on {', '.join(foreign)}")
+        return self._query(self.pool_for(magazine_id), sql, params)
+
+    def find_by_magazine(self, magazine_id):
+        return self.on_magazine(
+            magazine_id,
+            "SELECT * FROM articles WHERE magazine_id = %s ORDER BY published_at DESC",
+            (magazine_id,),
+        )
+
+    def scatter(self, sql, params=None, sort_key=None, reverse=False, limit=None):
+        """Run sql on every shard in parallel and merge the rows"""
+        futures = [_get_executor().submit(self._query, pool, sql, params) for pool in self.pools]
+        rows = [row for future in futures for row in future.result()]
+        if sort_key is not None:
+            rows.sort(key=sort_key, reverse=reverse)
+        return rows[:limit] if limit is not None else rows
+
+    def find_by_id(self, article_id):
+        rows = self.scatter("SELECT * FROM articles WHERE id = %s", (article_id,))
+        return rows[0] if rows else None
+
+    def find_by_title(self, pattern):
+        return self.scatter(
+            "SELECT * FROM articles WHERE title ILIKE %s", (pattern,),
+            sort_key=lambda row: row["id"],
+        )
+
+    def find_by_author(self, author_id):
+        # Author.articles() lives here too: one author writes for many magazines
+        return self.scatter(
+            "SELECT * FROM articles WHERE author_id = %s", (author_id,),
+            sort_key=_newest_first, reverse=True,
+        )
+
+    def closeall(self):
+        for pool in self.pools:
+            pool.closeall()
+
+
+def rebalance(old_shards, new_shards, batch_size=1000, dry_run=False, log=print):
+    """Move every magazine whose owner differs between the old and new rings
+
+    Rows are copied with ON CONFLICT DO NOTHING before being deleted from the
+    source, one magazine per transaction pair, so an interrupted run can
+    simply be started again.
+    """
+    old_ring = HashRing(shard_name(config) for config in old_shards)
+    new_ring = HashRing(shard_name(config) for config in new_shards)
+    new_index = {shard_name(config): i for i, config in enumerate(new_shards)}
+    new_pools = [ConnectionPool(config, role="rebalance-target") for config in new_shards]
+    columns = ", ".join(ARTICLE_COLUMNS)
+    placeholders = ", ".join(["%s"] * len(ARTICLE_COLUMNS))
+    moved = 0
+    try:
+        for source_index, config in enumerate(old_shards):
+            source = ConnectionPool(config, max_size=1, role="rebalance-source")
+            try:
+                with source.connection() as src:
+                    with src.cursor() as cursor:
+                        cursor.execute("SELECT DISTINCT magazine_id FROM articles")
+                        magazine_ids = [row["magazine_id"] for row in cursor.fetchall()]
+                    for magazine_id in magazine_ids:
+                        if old_ring.lookup(magazine_id) != source_index:
+                            continue
+                        target_name = new_ring.names[new_ring.lookup(magazine_id)]
+                        if target_name == shard_name(config):
+                            continue
+                        log(f"magazine {magazine_id}: {shard_name(config)} -> {target_name}")
+                        if dry_run:
+                            continue
+                        moved += _move_magazine(
+                            src, new_pools[new_index[target_name]], magazine_id,
+                            columns, placeholders, batch_size,
+                        )
+            finally:
+                source.closeall()
+    finally:
+        for pool in new_pools:
+            pool.closeall()
+    return moved
+
+
+def _move_magazine(src, target_pool, magazine_id, columns, placeholders, batch_size):
+    where = "magazine_id IS NULL" if magazine_id is None else "magazine_id = %s"
+    params = () if magazine_id is None else (magazine_id,)
+    src.autocommit = False
+    try:
+        with src.cursor() as cursor:
+            cursor.execute(f"SELECT {columns} FROM articles WHERE {where} FOR UPDATE", params)
+            copied = []
+            with target_pool.connection() as dst:
+                dst.autocommit = False
+                with dst.cursor() as out:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        out.executemany(
+                            f"INSERT INTO articles ({columns}) VALUES ({placeholders}) "
+                            "ON CONFLICT (id) DO NOTHING",
+                            [tuple(row[c] for c in ARTICLE_COLUMNS) for row in rows],
+                        )
+                        copied.extend(row["id"] for row in rows)
+                dst.commit()
+            # By id, not by magazine: the DELETE gets a fresh snapshot, so rows
+            # inserted since the SELECT would go without ever being copied
+            cursor.execute("DELETE FROM articles WHERE id = ANY(%s)", (copied,))
+            moved = len(copied)
+        src.commit()
+    except BaseException:
+        src.rollback()
+        raise
+    finally:
+        src.autocommit = True
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lib.db.sharding")
+    commands = parser.add_subparsers(dest="command", required=True)
+    move = commands.add_parser("rebalance", help="move articles after the shard list changes")
+    move.add_argument("--from", dest="old", required=True, help="current shards, host:port/dbname,...")
+    move.add_argument("--to", dest="new", required=True, help="new shards, host:port/dbname,...")
+    move.add_argument("--batch-size", type=int, default=1000)
+    move.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    moved = rebalance(
+        _server_configs(args.old), _server_configs(args.new),
+        batch_size=args.batch_size, dry_run=args.dry_run,
+    )
+    print(f"moved {moved} articles")
+
+
+if __name__ == "__main__":
+    main()
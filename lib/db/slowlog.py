@@ -0,0 +1,143 @@
+# lib/db/slowlog.py
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from lib.db import instrumentation
+
+_ids = itertools.count(1)
+
+
+def redact(params):
+    """Keep ids and flags, hide everything else (titles, content, emails...)"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact((value,))[0] for key, value in params.items()}
+    redacted = []
+    for value in params:
+        if value is None or isinstance(value, (bool, int, float)):
+            redacted.append(value)
+        elif isinstance(value, str):
+            redacted.append(f"<str len={len(value)}>")
+        else:
+            redacted.append(f"<{type(value).__name__}>")
+    return redacted
+
+
+class SlowQueryLog:
+    """after-hook writing statements slower than threshold_ms to a rotating JSONL file
+
+    A sample of slow SELECTs (explain_sample_rate) is re-run under
+    EXPLAIN (ANALYZE, BUFFERS) on a separate one-connection pool, in a
+    background thread. The plan is logged as a second record with the same id.
+    """
+
+    def __init__(self, path="slow_queries.jsonl", threshold_ms=200.0, explain_sample_rate=0.1,
+                 max_bytes=10 * 1024 * 1024, backup_count=5, max_pending_explains=4):
+        self.threshold = threshold_ms / 1000
+        self.explain_sample_rate = explain_sample_rate
+        self.max_pending_explains = max_pending_explains
+        self.logger = logging.getLogger(f"articles.slow_queries.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pool = None
+
+    def _write(self, record):
+        self.logger.info(json.dumps(record, default=str))
+
+    def __call__(self, event):
+        if event.duration < self.threshold:
+            return
+        record_id = next(_ids)
+        self._write({
+            "id": record_id,
+            "type": "slow_query",
+            "at": datetime.now(timezone.utc).isoformat(),
+            "method": event.method,
+            "shape": event.shape,
+            "params": redact(event.params),
+            "duration_ms": round(event.duration * 1000, 3),
+            "rowcount": event.rowcount,
+            "error": repr(event.error) if event.error is not None else None,
+        })
+        if (
+            event.error is None
+            and event.sql.lstrip().upper().startswith("SELECT")
+            and random.random() < self.explain_sample_rate
+        ):
+            self._schedule_explain(record_id, event)
+
+    def _schedule_explain(self, record_id, event):
+        with self._lock:
+            if self._pending >= self.max_pending_explains:
+                return
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slowlog-explain")
+        self._executor.submit(self._explain, record_id, event.sql, event.params, event.method)
+
+    def _explain(self, record_id, sql, params, method):
+        try:
+            from lib.db.pool import ConnectionPool
+
+            if self._pool is None:
+                self._pool = ConnectionPool(max_size=1, role="slowlog-explain")
+            started = time.perf_counter()
+            with self._pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    # Plain cursor.execute: the EXPLAIN itself must not pass through the hooks
+                    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+                    plan = cursor.fetchone()["QUERY PLAN"]
+            self._write({
+                "id": record_id,
+                "type": "explain",
+                "method": method,
+                "explain_ms": round((time.perf_counter() - started) * 1000, 3),
+                "plan": plan,
+            })
+        except Exception as error:
+            self._write({"id": record_id, "type": "explain_failed", "method": method, "error": repr(error)})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def install(self):
+        instrumentation.add_hook(after=self)
+        return self
+
+    def uninstall(self):
+        instrumentation.remove_hook(after=self)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._pool is not None:
+            self._pool.closeall()
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+
+def install_from_env():
+    """ARTICLES_SLOW_QUERY_MS turns the log on; ARTICLES_SLOW_QUERY_LOG and
+    ARTICLES_SLOW_QUERY_EXPLAIN_RATE set the file and the EXPLAIN sample rate"""
+    threshold = os.getenv("ARTICLES_SLOW_QUERY_MS")
+    if not threshold:
+        return None
+    return SlowQueryLog(
+        path=os.getenv("ARTICLES_SLOW_QUERY_LOG", "slow_queries.jsonl"),
+        threshold_ms=float(threshold),
+        explain_sample_rate=float(os.getenv("ARTICLES_SLOW_QUERY_EXPLAIN_RATE", "0.1")),
+    ).install()
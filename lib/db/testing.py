@@ -0,0 +1,60 @@
+# lib/db/testing.py
+import contextvars
+from contextlib import contextmanager
+
+from lib.db import instrumentation
+
+_counters = contextvars.ContextVar("query_counters", default=())
+_hook_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, event):
+        self.statements.append((event.method, event.shape))
+
+
+def _after(event):
+    for counter in _counters.get():
+        counter(event)
+
+
+@contextmanager
+def count_queries():
+    """Collect every statement the model layer issues inside the block"""
+    global _hook_installed
+    if not _hook_installed:
+        instrumentation.add_hook(after=_after)
+        _hook_installed = True
+    counter = QueryCounter()
+    token = _counters.set(_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """Fail when the block issues more than budget statements
+
+        with assert_max_queries(1):
+            author.magazines()
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > budget:
+        listing = "\n".join(
+            f"  {i}. {method or '-'}: {statement}" for i, (method, statement) in enumerate(counter.statements, 1)
+        )
+        raise QueryBudgetExceeded(f"{counter.count} queries issued, budget was {budget}:\n{listing}")